@@ -0,0 +1,170 @@
+import logging
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
+from typing import List, Tuple
+
+import psycopg2
+from psycopg2.extras import DictCursor
+
+from config import BACKFILL_PARTITIONS, BACKFILL_WORKERS, DSL
+from extract import MIN_ID, MIN_MODIFIED, Extraction, FilmExtraction
+from index_manager import IndexManager
+from load import Load, get_elastic
+from queries import (
+    FW_BACKFILL_QUERY,
+    GENRE_BACKFILL_QUERY,
+    LAST_MODIFIED_QUERY,
+    PERSON_BACKFILL_QUERY,
+)
+from state import State, get_storage
+from transform import Transform
+
+BACKFILL_QUERIES = {
+    "genres": GENRE_BACKFILL_QUERY,
+    "persons": PERSON_BACKFILL_QUERY,
+    "movies": FW_BACKFILL_QUERY,
+}
+TABLES = {
+    "genres": "content.genre",
+    "persons": "content.person",
+    "movies": "content.film_work",
+}
+# Отметка законченной партиции: больше id внутри диапазона нет.
+MAX_ID = "ffffffff-ffff-ffff-ffff-ffffffffffff"
+
+
+def partitions(count: int) -> List[Tuple[str, str]]:
+    """Разбить пространство UUID на count непересекающихся диапазонов."""
+    size = 2**128
+    return [
+        (
+            str(uuid.UUID(int=number * size // count)),
+            str(uuid.UUID(int=(number + 1) * size // count - 1)),
+        )
+        for number in range(count)
+    ]
+
+
+def partition_key(index: str, number: int, count: int) -> str:
+    return f"{index}_backfill_{number}_of_{count}_id"
+
+
+def backfill_partition(task: tuple) -> dict:
+    """
+    Загрузить одну партицию. Выполняется в отдельном процессе со своими
+    соединениями, а позиция партиции хранится под собственным ключом,
+    поэтому прерванная переиндексация продолжается с места остановки.
+    """
+    index, target, number, count, lower, upper = task
+    state = State(get_storage())
+    key = partition_key(index, number, count)
+    transformer = Transform(index)
+    loader = Load(get_elastic(), target)
+    docs_count = 0
+    started = monotonic()
+    with psycopg2.connect(**DSL, cursor_factory=DictCursor) as pg_conn:
+        e = Extraction(pg_conn, index, BACKFILL_QUERIES[index])
+        batches = e.extract(last_id=state.get_state(key), lower=lower, upper=upper)
+        for batch in batches:
+            docs = transformer.transform(batch)
+            loader.load(docs)
+            state.set_state(key, docs[-1].id)
+            docs_count += len(docs)
+    state.set_state(key, MAX_ID)
+    return {
+        "index": index,
+        "partition": number,
+        "docs": docs_count,
+        "seconds": monotonic() - started,
+    }
+
+
+def needs_backfill(state: State, index: str) -> bool:
+    return (
+        state.get_state(f"{index}_modified") is None
+        or state.get_state(f"{index}_backfill_since") is not None
+    )
+
+
+def backfill(
+    pg_conn,
+    state: State,
+    index: str,
+    workers: int = BACKFILL_WORKERS,
+    count: int = BACKFILL_PARTITIONS,
+    invalidator=None,
+) -> None:
+    """
+    Полная переиндексация index пулом процессов по диапазонам UUID.
+    Данные грузятся в новый версионный индекс, алиас index переключается
+    на него только в конце, поэтому API не видит недогруженный индекс.
+    После нее инкрементальная загрузка продолжается с момента начала
+    переиндексации, чтобы не потерять изменения, сделанные во время нее.
+    """
+    es = get_elastic()
+    manager = IndexManager(es)
+    since = state.get_state(f"{index}_backfill_since")
+    if since is None:
+        with pg_conn.cursor() as cursor:
+            cursor.execute(LAST_MODIFIED_QUERY.format(table=TABLES[index]))
+            last_modified = cursor.fetchone()[0]
+        pg_conn.commit()
+        since = last_modified.isoformat() if last_modified else MIN_MODIFIED
+        state.set_state(f"{index}_backfill_since", since)
+    target = state.get_state(f"{index}_backfill_target")
+    if target is None:
+        target = manager.create(index)
+        state.set_state(f"{index}_backfill_target", target)
+
+    logging.info(
+        "Backfill of %s into %s: %d partitions, %d workers.",
+        index,
+        target,
+        count,
+        workers,
+    )
+    tasks = [
+        (index, target, number, count, lower, upper)
+        for number, (lower, upper) in enumerate(partitions(count))
+    ]
+    started = monotonic()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        reports = list(pool.map(backfill_partition, tasks))
+    manager.publish(target, index)
+    elapsed = monotonic() - started
+
+    for report in reports:
+        logging.info(
+            "Backfill %s partition %d: %d docs in %.1fs (%.0f docs/sec).",
+            report["index"],
+            report["partition"],
+            report["docs"],
+            report["seconds"],
+            report["docs"] / report["seconds"] if report["seconds"] else 0,
+        )
+    total = sum(report["docs"] for report in reports)
+    logging.info(
+        "Backfill of %s finished: %d docs in %.1fs (%.0f docs/sec).",
+        index,
+        total,
+        elapsed,
+        total / elapsed if elapsed else 0,
+    )
+
+    obsolete = [partition_key(index, number, count) for number in range(count)]
+    if index == "movies":
+        # Источники изменений фильмов тоже отсчитываются от начала переиндексации.
+        for prefix, _, _ in FilmExtraction.SOURCES:
+            obsolete.extend([f"{prefix}_modified", f"{prefix}_id"])
+    state.set_states({f"{index}_modified": since, f"{index}_id": MIN_ID})
+    # Ключи удаляются после новой позиции: при падении между записями
+    # переиндексация просто опубликуется повторно.
+    state.delete_states(
+        obsolete + [f"{index}_backfill_since", f"{index}_backfill_target"]
+    )
+    if invalidator:
+        # Партиции кеш не сбрасывают, поэтому после переиндексации
+        # кеш API по индексу сбрасывается целиком один раз.
+        es.indices.refresh(index=index)
+        invalidator.flush(index)
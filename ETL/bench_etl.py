@@ -0,0 +1,322 @@
+"""
+Офлайн-бенчмарк ETL: синтетические строки в формате запросов к postgres
+проходят через настоящие Extraction/FilmExtraction -> Transform -> Load,
+а postgres и elasticsearch заменены заглушками в памяти. Отчет - docs/sec,
+время каждой стадии и пиковая память; результаты можно сохранить в JSON
+и сравнить с прогоном на другом коммите.
+
+    python bench_etl.py --films 100000 --cast 30 --json after.json --compare before.json
+"""
+import argparse
+import bisect
+import json
+import random
+import resource
+import subprocess
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+
+from elasticsearch.serializer import JSONSerializer
+
+from config import BATCH_SIZE
+from extract import get_extraction
+from load import Load
+from queries import (
+    FW_BY_IDS_QUERY,
+    FW_CHANGED_QUERY,
+    GENRE_CHANGED_QUERY,
+    GENRE_QUERY,
+    PERSON_CHANGED_QUERY,
+    PERSON_QUERY,
+)
+from state import BaseStorage, State
+from transform import Transform
+
+ROLES = ("actor", "actor", "actor", "writer", "director")
+GENRES = 30
+
+
+class Dataset:
+    """Синтетическая база: фильмы, персоны и жанры с реалистичным составом."""
+
+    def __init__(self, films: int, persons: int, cast: int, seed: int = 0):
+        rnd = random.Random(seed)
+        start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+        def new_id():
+            return str(uuid.UUID(int=rnd.getrandbits(128)))
+
+        self.genres = [
+            {
+                "id": new_id(),
+                "genre_name": f"Genre {n}",
+                "genre_description": f"Description of genre {n}",
+                "modified": start,
+            }
+            for n in range(GENRES)
+        ]
+        self.persons = [
+            {"id": new_id(), "full_name": f"Person {n}", "modified": start, "films": []}
+            for n in range(persons)
+        ]
+        self.films = {}
+        for n in range(films):
+            film = {
+                "id": new_id(),
+                "title": f"Movie {n}",
+                "description": "Lorem ipsum dolor sit amet. " * 8,
+                "rating": round(rnd.uniform(1, 10), 1),
+                "type": "movie",
+                "created": start,
+                # Несколько фильмов на одну метку времени, как после массового импорта.
+                "modified": start + timedelta(seconds=n // 10),
+                "persons": [],
+                "genres": [],
+            }
+            for person in rnd.sample(self.persons, min(cast, persons)):
+                role = rnd.choice(ROLES)
+                film["persons"].append(
+                    {
+                        "person_role": role,
+                        "person_id": person["id"],
+                        "person_name": person["full_name"],
+                    }
+                )
+                person["films"].append((film, role))
+            for genre in rnd.sample(self.genres, 3):
+                film["genres"].append(
+                    {"g_id": genre["id"], "g_name": genre["genre_name"]}
+                )
+            self.films[film["id"]] = film
+        self.changed_films = sorted(
+            ({"id": f["id"], "modified": f["modified"]} for f in self.films.values()),
+            key=lambda row: (row["modified"], row["id"]),
+        )
+        self.changed_keys = [(row["modified"], row["id"]) for row in self.changed_films]
+
+    def person_rows(self):
+        for person in self.persons:
+            yield {
+                "id": person["id"],
+                "full_name": person["full_name"],
+                "modified": person["modified"],
+                "films": [
+                    {
+                        "fw_id": film["id"],
+                        "fw_title": film["title"],
+                        "fw_rating": film["rating"],
+                        "fw_type": film["type"],
+                    }
+                    for film, _ in person["films"]
+                ],
+                "roles": sorted({role for _, role in person["films"]}) or [None],
+            }
+
+
+class FakeCursor:
+    """Курсор, отвечающий на запросы ETL строками из Dataset."""
+
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+        self.itersize = BATCH_SIZE
+        self._rows = iter(())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        params = params or {}
+        if query == FW_CHANGED_QUERY:
+            start = 0
+            if params["modified"] != "-infinity":
+                modified = datetime.fromisoformat(params["modified"])
+                start = bisect.bisect_right(
+                    self.dataset.changed_keys, (modified, params["id"])
+                )
+            rows = self.dataset.changed_films[start:start + params["limit"]]
+        elif query == FW_BY_IDS_QUERY:
+            rows = [self.dataset.films[film_id] for film_id in params["ids"]]
+        elif query in (PERSON_CHANGED_QUERY, GENRE_CHANGED_QUERY):
+            # Источники персон и жанров в бенчмарке не меняются.
+            rows = []
+        elif query == PERSON_QUERY:
+            rows = self.dataset.person_rows()
+        elif query == GENRE_QUERY:
+            rows = self.dataset.genres
+        else:
+            raise ValueError("Unexpected query")
+        self._rows = iter(rows)
+
+    def fetchmany(self, size):
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+class FakeConnection:
+    def __init__(self, dataset: Dataset):
+        self.dataset = dataset
+
+    def cursor(self, name=None, cursor_factory=None):
+        return FakeCursor(self.dataset)
+
+    def commit(self):
+        pass
+
+
+class FakeElasticsearch:
+    """Принимает _bulk и отвечает успехом, считая документы и байты."""
+
+    class Transport:
+        # helpers.streaming_bulk сериализует действия через client.transport.
+        serializer = JSONSerializer()
+
+    def __init__(self):
+        self.transport = self.Transport()
+        self.requests = 0
+        self.bytes = 0
+
+    def bulk(self, body, **kwargs):
+        self.requests += 1
+        self.bytes += len(body)
+        lines = body.splitlines()
+        items = []
+        for action_line in lines[::2]:
+            op_type, meta = next(iter(json.loads(action_line).items()))
+            items.append({op_type: {"_id": meta.get("_id"), "status": 200}})
+        return {"errors": False, "items": items}
+
+
+class MemoryStorage(BaseStorage):
+    def __init__(self):
+        self.state = {}
+
+    def save_state(self, state: dict) -> None:
+        self.state = dict(state)
+
+    def retrieve_state(self) -> dict:
+        return dict(self.state)
+
+
+def run_index(conn, es, index: str) -> dict:
+    state = State(MemoryStorage())
+    transformer = Transform(index)
+    loader = Load(es, index)
+    timings = {"extract": 0.0, "transform": 0.0, "load": 0.0}
+    docs_count = 0
+    started = perf_counter()
+    batches = get_extraction(conn, index).batches(state)
+    while True:
+        mark = perf_counter()
+        item = next(batches, None)
+        timings["extract"] += perf_counter() - mark
+        if item is None:
+            break
+        batch, checkpoint = item
+        mark = perf_counter()
+        docs = transformer.transform(batch)
+        timings["transform"] += perf_counter() - mark
+        mark = perf_counter()
+        docs_count += loader.load(docs)
+        if checkpoint:
+            state.set_states(checkpoint)
+        timings["load"] += perf_counter() - mark
+    elapsed = perf_counter() - started
+    return {
+        "docs": docs_count,
+        "seconds": elapsed,
+        "docs_per_sec": docs_count / elapsed if elapsed else 0,
+        "stages": timings,
+    }
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss в Linux - в килобайтах.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(results: dict, baseline: dict = None) -> None:
+    print(f"revision {results['revision']}, batch size {results['batch_size']}")
+    for index, report in results["indexes"].items():
+        line = (
+            f"{index:<8} {report['docs']:>8} docs {report['seconds']:8.2f}s "
+            f"{report['docs_per_sec']:10.0f} docs/sec  "
+            + "  ".join(f"{k} {v:.2f}s" for k, v in report["stages"].items())
+        )
+        if baseline and index in baseline["indexes"]:
+            before = baseline["indexes"][index]["docs_per_sec"]
+            change = (report["docs_per_sec"] / before - 1) * 100
+            line += f"  ({change:+.1f}% vs {baseline['revision']})"
+        print(line)
+    line = f"peak memory: {results['peak_memory_mb']:.1f} MB"
+    if "dataset_memory_mb" in results:
+        line += f" above {results['dataset_memory_mb']:.1f} MB with the dataset"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--films", type=int, default=10000)
+    parser.add_argument("--persons", type=int, default=None)
+    parser.add_argument("--cast", type=int, default=20)
+    parser.add_argument("--indexes", nargs="+", default=["genres", "persons", "movies"])
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="точный пик памяти Python (замедляет прогон, "
+        "сравнивать только между собой)",
+    )
+    parser.add_argument("--json", help="сохранить результат в файл")
+    parser.add_argument("--compare", help="сравнить с сохраненным результатом")
+    args = parser.parse_args()
+
+    dataset = Dataset(args.films, args.persons or args.films * 2, args.cast)
+    conn, es = FakeConnection(dataset), FakeElasticsearch()
+    # Синтетические данные целиком в памяти, их размер в отчет не входит.
+    dataset_rss_mb = max_rss_mb()
+    if args.tracemalloc:
+        tracemalloc.start()
+    results = {
+        "revision": git_revision(),
+        "batch_size": BATCH_SIZE,
+        "params": {
+            "films": args.films,
+            "cast": args.cast,
+            "tracemalloc": args.tracemalloc,
+        },
+        "indexes": {index: run_index(conn, es, index) for index in args.indexes},
+    }
+    if args.tracemalloc:
+        results["peak_memory_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+    else:
+        # Прирост пика RSS над памятью процесса с уже построенным датасетом.
+        results["dataset_memory_mb"] = dataset_rss_mb
+        results["peak_memory_mb"] = max_rss_mb() - dataset_rss_mb
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Микробенчмарк трансформации фильмов: CPU на документ у прежней построчной
+трансформации с сериализацией stdlib json (как JSONSerializer клиента
+elasticsearch) и у пакетной Transform с orjson.
+
+    python bench_transform.py --films 20000 --cast 30
+"""
+import argparse
+import json
+import random
+import uuid
+from datetime import date, datetime, timezone
+from time import perf_counter
+
+from transform import Transform
+
+ROLES = ("actor", "actor", "actor", "writer", "director")
+
+
+def fake_movie_rows(films: int, cast: int, seed: int = 0) -> list:
+    """Строки той же формы, что отдает FW_BY_IDS_QUERY."""
+    rnd = random.Random(seed)
+    modified = datetime(2021, 6, 16, 20, 14, 9, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.UUID(int=rnd.getrandbits(128))),
+            "title": f"Movie {n}",
+            "description": "Lorem ipsum dolor sit amet. " * 8,
+            "rating": round(rnd.uniform(1, 10), 1),
+            "type": "movie",
+            "created": modified,
+            "modified": modified,
+            "persons": [
+                {
+                    "person_role": rnd.choice(ROLES),
+                    "person_id": str(uuid.UUID(int=rnd.getrandbits(128))),
+                    "person_name": f"Person {rnd.randrange(100000)}",
+                }
+                for _ in range(cast)
+            ],
+            "genres": [
+                {"g_id": str(uuid.UUID(int=g)), "g_name": f"Genre {g}"}
+                for g in rnd.sample(range(30), 3)
+            ],
+        }
+        for n in range(films)
+    ]
+
+
+def legacy_transform(d: dict) -> dict:
+    """Прежняя Transform.transform для фильма: три прохода по персонам."""
+    directors = [
+        {"id": el["person_id"], "name": el["person_name"]}
+        for el in d["persons"]
+        if el["person_role"] == "director"
+    ]
+    writers = [
+        {"id": el["person_id"], "name": el["person_name"]}
+        for el in d["persons"]
+        if el["person_role"] == "writer"
+    ]
+    actors = [
+        {"id": el["person_id"], "name": el["person_name"]}
+        for el in d["persons"]
+        if el["person_role"] == "actor"
+    ]
+    genres = [{"id": el["g_id"], "name": el["g_name"]} for el in d["genres"]]
+    return {
+        "id": d["id"],
+        "title": d["title"],
+        "description": d["description"],
+        "type": d["type"],
+        "creation_date": d["created"],
+        "rating": d["rating"],
+        "modified": d["modified"],
+        "directors": directors,
+        "writers": writers,
+        "actors": actors,
+        "genres": genres,
+    }
+
+
+def legacy_serialize(data: dict) -> str:
+    def default(value):
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        raise TypeError(f"Unable to serialize {value!r}")
+
+    return json.dumps(data, default=default, ensure_ascii=False, separators=(",", ":"))
+
+
+def measure(title: str, func, rows: list, repeat: int) -> float:
+    best = min(_timed(func, rows) for _ in range(repeat))
+    per_doc = best / len(rows) * 1e6
+    print(f"{title:<28} {per_doc:8.2f} us/doc  {len(rows) / best:10.0f} docs/sec")
+    return per_doc
+
+
+def _timed(func, rows: list) -> float:
+    started = perf_counter()
+    func(rows)
+    return perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--films", type=int, default=20000)
+    parser.add_argument("--cast", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = fake_movie_rows(args.films, args.cast)
+    transformer = Transform("movies")
+    before = measure(
+        "legacy row + json",
+        lambda batch: [legacy_serialize(legacy_transform(row)) for row in batch],
+        rows,
+        args.repeat,
+    )
+    after = measure("batch + orjson", transformer.transform, rows, args.repeat)
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
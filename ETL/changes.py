@@ -0,0 +1,143 @@
+import json
+import logging
+import os
+import select
+from collections import defaultdict
+from dataclasses import dataclass, field
+from time import monotonic, sleep
+from typing import Dict, Set
+
+import psycopg2
+
+from config import (
+    CHANGE_DEBOUNCE,
+    CHANGE_INSTALL_TRIGGERS,
+    POLL_MAX_INTERVAL,
+    POLL_MIN_INTERVAL,
+)
+
+CHANNEL = "etl_changes"
+NOTIFY_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "notify.sql")
+INDEXES = ("genres", "persons", "movies")
+# Индексы, которые догоняются инкрементальной загрузкой по modified
+# при изменении строки таблицы.
+TABLE_INDEXES = {
+    "film_work": ("movies",),
+    "person": ("persons", "movies"),
+    "genre": ("genres", "movies"),
+}
+
+
+@dataclass
+class Changes:
+    """
+    Что нужно синхронизировать: индексы для инкрементальной загрузки
+    и id документов, которые надо перезагрузить адресно (изменения связей
+    фильм-персона и фильм-жанр не меняют modified).
+    """
+
+    indexes: Set[str] = field(default_factory=set)
+    ids: Dict[str, Set[str]] = field(default_factory=lambda: defaultdict(set))
+
+    def add(self, payload: dict) -> None:
+        table = payload.get("table")
+        self.indexes.update(TABLE_INDEXES.get(table, ()))
+        if table in ("person_film_work", "genre_film_work"):
+            self.ids["movies"].add(payload["film_work_id"])
+        if table == "person_film_work":
+            self.ids["persons"].add(payload["person_id"])
+
+    def __bool__(self) -> bool:
+        return bool(self.indexes or self.ids)
+
+
+class AdaptiveInterval:
+    """Интервал опроса, который удваивается, пока изменений нет."""
+
+    def __init__(
+        self,
+        min_interval: float = POLL_MIN_INTERVAL,
+        max_interval: float = POLL_MAX_INTERVAL,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.value = min_interval
+
+    def done(self, loaded: int) -> None:
+        if loaded:
+            self.value = self.min_interval
+        else:
+            self.value = min(self.max_interval, self.value * 2)
+
+
+class Poller:
+    """Режим опроса: каждый цикл проверяет все индексы."""
+
+    def __init__(self):
+        self.interval = AdaptiveInterval()
+
+    def wait(self) -> Changes:
+        sleep(self.interval.value)
+        return Changes(indexes=set(INDEXES))
+
+    def done(self, loaded: int) -> None:
+        self.interval.done(loaded)
+
+
+class ChangeListener:
+    """
+    Режим уведомлений: триггеры в postgres шлют NOTIFY при изменении строк,
+    и ETL просыпается только когда что-то поменялось. Если уведомлений
+    нет дольше адаптивного интервала, делается контрольная проверка всех
+    индексов - на случай уведомлений, потерянных пока ETL был отключен.
+    """
+
+    def __init__(self, dsl: dict):
+        self.conn = psycopg2.connect(**dsl)
+        self.conn.autocommit = True
+        self.interval = AdaptiveInterval()
+        self._sweep = False
+        if CHANGE_INSTALL_TRIGGERS:
+            self.install()
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        logging.info("Listening for changes on channel %s.", CHANNEL)
+
+    def install(self) -> None:
+        with open(NOTIFY_SQL) as f, self.conn.cursor() as cursor:
+            cursor.execute(f.read())
+
+    def wait(self) -> Changes:
+        self._sweep = not self._poll(self.interval.value)
+        if self._sweep:
+            return Changes(indexes=set(INDEXES))
+        # Даем догнать остальным уведомлениям той же пачки изменений.
+        deadline = monotonic() + CHANGE_DEBOUNCE
+        while (left := deadline - monotonic()) > 0 and self._poll(left):
+            pass
+        changes = Changes()
+        for notify in self.conn.notifies:
+            changes.add(json.loads(notify.payload))
+        logging.info(
+            "Got %d change notifications: indexes %s, ids %s.",
+            len(self.conn.notifies),
+            sorted(changes.indexes),
+            {index: len(ids) for index, ids in changes.ids.items()},
+        )
+        self.conn.notifies.clear()
+        return changes
+
+    def done(self, loaded: int) -> None:
+        # Интервал контрольных проверок меняется только по их результатам.
+        if self._sweep:
+            self.interval.done(loaded)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _poll(self, timeout: float) -> bool:
+        """Дождаться новых уведомлений не дольше timeout секунд."""
+        if select.select([self.conn], [], [], timeout) == ([], [], []):
+            return False
+        self.conn.poll()
+        return True
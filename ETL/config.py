@@ -0,0 +1,55 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_flag(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+DSL = {
+    "dbname": os.getenv("DB_NAME", "movies_database"),
+    "user": os.getenv("DB_USER", "app"),
+    "password": os.getenv("DB_PASSWORD", "123qwe"),
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": os.getenv("DB_PORT", 5432),
+}
+ELASTIC_HOST = os.getenv("ELASTIC_HOST", "localhost")
+ELASTIC_PORT = os.getenv("ELASTIC_PORT", "9200")
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+
+STATE_STORAGE = os.getenv("ETL_STATE_STORAGE", "json")
+STATE_PATH = os.getenv("ETL_STATE_PATH")
+STATE_KEY = os.getenv("ETL_STATE_KEY", "etl_state")
+
+BATCH_SIZE = int(os.getenv("ETL_BATCH_SIZE", 500))
+BULK_CHUNK_SIZE = int(os.getenv("ETL_BULK_CHUNK_SIZE", 500))
+BULK_CHUNK_BYTES = int(os.getenv("ETL_BULK_CHUNK_BYTES", 10 * 1024 * 1024))
+BULK_MAX_RETRIES = int(os.getenv("ETL_BULK_MAX_RETRIES", 5))
+BULK_INITIAL_BACKOFF = float(os.getenv("ETL_BULK_INITIAL_BACKOFF", 1))
+BULK_MAX_BACKOFF = float(os.getenv("ETL_BULK_MAX_BACKOFF", 60))
+INDEX_REPLICAS = int(os.getenv("ETL_INDEX_REPLICAS", 1))
+INDEX_KEEP_OLD = env_flag("ETL_INDEX_KEEP_OLD")
+PARTIAL_UPDATES = env_flag("ETL_PARTIAL_UPDATES")
+CACHE_INVALIDATION = env_flag("ETL_CACHE_INVALIDATION", "1")
+
+PIPELINE = env_flag("ETL_PIPELINE")
+PIPELINE_QUEUE_SIZE = int(os.getenv("ETL_PIPELINE_QUEUE_SIZE", 4))
+PIPELINE_TRANSFORM_WORKERS = int(os.getenv("ETL_PIPELINE_TRANSFORM_WORKERS", 1))
+PIPELINE_LOAD_WORKERS = int(os.getenv("ETL_PIPELINE_LOAD_WORKERS", 2))
+
+BACKFILL = env_flag("ETL_BACKFILL")
+BACKFILL_WORKERS = int(os.getenv("ETL_BACKFILL_WORKERS", os.cpu_count() or 1))
+BACKFILL_PARTITIONS = int(os.getenv("ETL_BACKFILL_PARTITIONS", BACKFILL_WORKERS * 2))
+
+CHANGE_MODE = os.getenv("ETL_CHANGE_MODE", "poll")
+CHANGE_INSTALL_TRIGGERS = env_flag("ETL_CHANGE_INSTALL_TRIGGERS", "1")
+CHANGE_DEBOUNCE = float(os.getenv("ETL_CHANGE_DEBOUNCE", 0.5))
+POLL_MIN_INTERVAL = float(os.getenv("ETL_POLL_MIN_INTERVAL", 1))
+POLL_MAX_INTERVAL = float(os.getenv("ETL_POLL_MAX_INTERVAL", 60))
+
+METRICS_PORT = int(os.getenv("ETL_METRICS_PORT", 8001))
+PROGRESS_INTERVAL = float(os.getenv("ETL_PROGRESS_INTERVAL", 30))
@@ -0,0 +1,61 @@
+"""
+Сравнение однофазного запроса изменений фильмов (FW_QUERY) с двухфазным
+(FilmExtraction): планы EXPLAIN ANALYZE и время выполнения.
+
+    python explain_queries.py 2021-06-16T20:14:09+00:00
+"""
+import sys
+from time import monotonic
+
+import psycopg2
+from psycopg2.extras import DictCursor
+
+from config import BATCH_SIZE, DSL
+from extract import MIN_ID, MIN_MODIFIED
+from queries import (
+    FW_BY_IDS_QUERY,
+    FW_CHANGED_QUERY,
+    FW_IDS_BY_GENRES_QUERY,
+    FW_IDS_BY_PERSONS_QUERY,
+    FW_QUERY,
+    GENRE_CHANGED_QUERY,
+    PERSON_CHANGED_QUERY,
+)
+
+
+def explain(cursor, title: str, query: str, params: dict) -> list:
+    cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, params)
+    print(f"--- {title}")
+    print("\n".join(row[0] for row in cursor.fetchall()))
+    started = monotonic()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    print(f"--- {title}: {len(rows)} rows in {monotonic() - started:.3f}s\n")
+    return rows
+
+
+def main(modified: str) -> None:
+    params = {"modified": modified, "id": MIN_ID, "limit": BATCH_SIZE}
+    with psycopg2.connect(**DSL, cursor_factory=DictCursor) as conn:
+        with conn.cursor() as cursor:
+            explain(cursor, "single-phase FW_QUERY", FW_QUERY, params)
+            ids = set()
+            for title, changed_query, ids_query in (
+                ("films", FW_CHANGED_QUERY, None),
+                ("persons", PERSON_CHANGED_QUERY, FW_IDS_BY_PERSONS_QUERY),
+                ("genres", GENRE_CHANGED_QUERY, FW_IDS_BY_GENRES_QUERY),
+            ):
+                changed = explain(cursor, f"changed {title}", changed_query, params)
+                source_ids = [row["id"] for row in changed]
+                if ids_query and source_ids:
+                    rows = explain(
+                        cursor, f"films of {title}", ids_query, {"ids": source_ids}
+                    )
+                    source_ids = [row["id"] for row in rows]
+                ids.update(source_ids)
+            if ids:
+                explain(cursor, "enrich films", FW_BY_IDS_QUERY, {"ids": sorted(ids)})
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else MIN_MODIFIED)
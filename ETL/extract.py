@@ -0,0 +1,172 @@
+import logging
+from time import monotonic
+
+import backoff
+import psycopg2
+from psycopg2.extras import DictCursor
+
+from config import BATCH_SIZE, PARTIAL_UPDATES
+from queries import (
+    FW_BY_IDS_QUERY,
+    FW_CHANGED_QUERY,
+    FW_GENRE_LINKS_QUERY,
+    FW_IDS_BY_GENRES_QUERY,
+    FW_IDS_BY_PERSONS_QUERY,
+    FW_PERSON_LINKS_QUERY,
+    GENRE_CHANGED_QUERY,
+    GENRE_QUERY,
+    PERSON_CHANGED_QUERY,
+    PERSON_QUERY,
+)
+
+# Начальная позиция keyset-пагинации (modified, id) для пустого состояния.
+MIN_MODIFIED = "-infinity"
+MIN_ID = "00000000-0000-0000-0000-000000000000"
+
+
+class Extraction:
+    """
+    Потоковое чтение изменений через именованный (серверный) курсор.
+    Postgres отдает строки порциями по BATCH_SIZE, поэтому в памяти ETL
+    никогда не находится больше одной пачки. Строки упорядочены по (modified, id),
+    что позволяет продолжить чтение ровно с последней загруженной пары.
+    """
+
+    def __init__(self, conn, ind, query_db) -> None:
+        self.conn = conn
+        self.index = ind
+        self.query = query_db
+
+    def batches(self, state):
+        """Пачки строк с чекпоинтом, который сохраняется после их загрузки."""
+        modified_key, id_key = f"{self.index}_modified", f"{self.index}_id"
+        modified, last_id = state.get_state(modified_key), state.get_state(id_key)
+        for batch in self.extract(modified, last_id):
+            last = batch[-1]
+            yield batch, {
+                modified_key: last["modified"].isoformat(),
+                id_key: last["id"],
+            }
+
+    def extract(self, modified=None, last_id=None, **params):
+        params.update(modified=modified or MIN_MODIFIED, id=last_id or MIN_ID)
+        cursor = self.conn.cursor(name=f"etl_{self.index}", cursor_factory=DictCursor)
+        with cursor:
+            cursor.itersize = BATCH_SIZE
+            self._execute(cursor, params)
+            logging.debug("Data extracted.")
+            while batch := cursor.fetchmany(BATCH_SIZE):
+                yield batch
+        # Серверный курсор живет внутри транзакции, не держим ее открытой между циклами.
+        self.conn.commit()
+
+    @backoff.on_exception(
+        wait_gen=backoff.expo, exception=(psycopg2.Error, psycopg2.OperationalError)
+    )
+    def _execute(self, cursor, params):
+        cursor.execute(self.query, params)
+
+
+class FilmExtraction(Extraction):
+    """
+    Двухфазная загрузка фильмов. Сначала по каждому источнику изменений
+    (фильмы, персоны, жанры) страницами по (modified, id) собираются id
+    измененных фильмов, затем только эти фильмы обогащаются персонами
+    и жанрами запросом WHERE fw.id = ANY(...). У каждого источника
+    собственный чекпоинт.
+
+    С partial_updates изменения персон и жанров не перезагружают фильмы
+    целиком: для каждого затронутого фильма отдается строка с новыми именами,
+    из которой Transform строит скриптовое обновление вложенных списков.
+    """
+
+    # Префикс ключей состояния, запрос измененных строк и запрос их фильмов.
+    SOURCES = (
+        ("movies", FW_CHANGED_QUERY, None),
+        ("movies_persons", PERSON_CHANGED_QUERY, FW_IDS_BY_PERSONS_QUERY),
+        ("movies_genres", GENRE_CHANGED_QUERY, FW_IDS_BY_GENRES_QUERY),
+    )
+    # Запрос связей источника с фильмами и поля фильма, где лежат его имена.
+    PARTIAL_SOURCES = {
+        "movies_persons": (FW_PERSON_LINKS_QUERY, ("directors", "writers", "actors")),
+        "movies_genres": (FW_GENRE_LINKS_QUERY, ("genres",)),
+    }
+
+    def __init__(self, conn, partial_updates: bool = PARTIAL_UPDATES) -> None:
+        super().__init__(conn, "movies", FW_BY_IDS_QUERY)
+        self.partial_updates = partial_updates
+
+    def batches(self, state):
+        for prefix, changed_query, ids_query in self.SOURCES:
+            modified_key, id_key = f"{prefix}_modified", f"{prefix}_id"
+            # Раньше изменения персон и жанров отсчитывались от movies_modified.
+            modified = state.get_state(modified_key)
+            modified = modified or state.get_state("movies_modified")
+            last_id = state.get_state(id_key)
+            while changed := self._fetch(
+                changed_query,
+                modified=modified or MIN_MODIFIED,
+                id=last_id or MIN_ID,
+                limit=BATCH_SIZE,
+            ):
+                modified = changed[-1]["modified"].isoformat()
+                last_id = changed[-1]["id"]
+                checkpoint = {modified_key: modified, id_key: last_id}
+                ids = [row["id"] for row in changed]
+                if self.partial_updates and prefix in self.PARTIAL_SOURCES:
+                    yield from self._partial(prefix, ids, checkpoint)
+                    continue
+                started = monotonic()
+                if ids_query:
+                    ids = [row["id"] for row in self._fetch(ids_query, ids=ids)]
+                logging.debug(
+                    "%s: %d changed rows resolved to %d films in %.3fs.",
+                    prefix,
+                    len(changed),
+                    len(ids),
+                    monotonic() - started,
+                )
+                chunks = self._chunks(ids)
+                for number, chunk in enumerate(chunks, start=1):
+                    rows = self._fetch(self.query, ids=chunk)
+                    # Чекпоинт страницы сохраняется вместе с ее последней пачкой.
+                    yield rows, checkpoint if number == len(chunks) else {}
+            self.conn.commit()
+
+    def _partial(self, prefix: str, ids: list, checkpoint: dict):
+        """Строки обновления имен: id фильма, поля и новые имена по id."""
+        links_query, fields = self.PARTIAL_SOURCES[prefix]
+        films = {}
+        for link in self._fetch(links_query, ids=ids):
+            film = films.setdefault(
+                link["film_work_id"],
+                {"id": link["film_work_id"], "fields": fields, "names": {}},
+            )
+            film["names"][link["id"]] = link["name"]
+        chunks = self._chunks(list(films.values()))
+        for number, chunk in enumerate(chunks, start=1):
+            yield chunk, checkpoint if number == len(chunks) else {}
+
+    @staticmethod
+    def _chunks(items: list) -> list:
+        """Пачки по BATCH_SIZE, для пустой страницы - одна пустая пачка под чекпоинт."""
+        if not items:
+            return [[]]
+        return [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+
+    @backoff.on_exception(
+        wait_gen=backoff.expo, exception=(psycopg2.Error, psycopg2.OperationalError)
+    )
+    def _fetch(self, query, **params):
+        with self.conn.cursor(cursor_factory=DictCursor) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+
+QUERIES = {"genres": GENRE_QUERY, "persons": PERSON_QUERY}
+
+
+def get_extraction(conn, index: str) -> Extraction:
+    if index == "movies":
+        return FilmExtraction(conn)
+    return Extraction(conn, index, QUERIES[index])
@@ -0,0 +1,105 @@
+"""
+Управление индексами через алиасы (blue/green). API читает алиасы
+movies, persons и genres, а данные лежат в версионных индексах вида
+movies_20220601120000. Полная переиндексация грузится в новый индекс
+с отключенным refresh и без реплик, после чего настройки возвращаются,
+сегменты сливаются и алиас атомарно переключается на новый индекс.
+
+    python index_manager.py movies
+"""
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import List
+
+from elasticsearch import Elasticsearch, NotFoundError
+
+from config import INDEX_KEEP_OLD, INDEX_REPLICAS
+from load import get_elastic
+
+INDEXES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "indexes")
+# Настройки на время массовой загрузки.
+BULK_LOAD_SETTINGS = {"index": {"refresh_interval": "-1", "number_of_replicas": 0}}
+
+
+def index_body(alias: str) -> dict:
+    with open(os.path.join(INDEXES_DIR, f"{alias}.json")) as f:
+        return json.load(f)
+
+
+class IndexManager:
+    def __init__(self, es: Elasticsearch):
+        self.es = es
+
+    def indices(self, alias: str) -> List[str]:
+        """Индексы, на которые сейчас указывает алиас."""
+        try:
+            return list(self.es.indices.get_alias(name=alias))
+        except NotFoundError:
+            return []
+
+    def create(self, alias: str, bulk_load: bool = True) -> str:
+        """Создать новый версионный индекс, пока без алиаса."""
+        name = f"{alias}_{datetime.now(timezone.utc):%Y%m%d%H%M%S}"
+        body = index_body(alias)
+        settings = body.setdefault("settings", {})
+        if bulk_load:
+            settings.update(BULK_LOAD_SETTINGS["index"])
+        else:
+            settings["number_of_replicas"] = INDEX_REPLICAS
+        self.es.indices.create(index=name, body=body)
+        logging.info("Created index %s for alias %s.", name, alias)
+        return name
+
+    def publish(self, name: str, alias: str) -> None:
+        """
+        Вернуть рабочие настройки, слить сегменты и атомарно перевести
+        алиас на новый индекс. Старые индексы удаляются, если не задан
+        ETL_INDEX_KEEP_OLD.
+        """
+        refresh_interval = index_body(alias)["settings"].get("refresh_interval", "1s")
+        self.es.indices.put_settings(
+            index=name,
+            body={
+                "index": {
+                    "refresh_interval": refresh_interval,
+                    "number_of_replicas": INDEX_REPLICAS,
+                }
+            },
+        )
+        self.es.indices.forcemerge(
+            index=name, max_num_segments=1, request_timeout=60 * 60
+        )
+        self.es.indices.refresh(index=name)
+
+        aliased = self.indices(alias)
+        old = [index for index in aliased if index != name]
+        actions = [{"remove": {"index": index, "alias": alias}} for index in old]
+        if not aliased and self.es.indices.exists(index=alias):
+            # Индекс, созданный раньше скриптом indexes/*.sh, занимает имя алиаса.
+            actions.append({"remove_index": {"index": alias}})
+        actions.append({"add": {"index": name, "alias": alias}})
+        self.es.indices.update_aliases(body={"actions": actions})
+        logging.info("Alias %s now points to %s.", alias, name)
+
+        if not INDEX_KEEP_OLD:
+            for index in old:
+                self.es.indices.delete(index=index)
+                logging.info("Deleted old index %s.", index)
+
+    def ensure(self, alias: str) -> None:
+        """Создать индекс с алиасом, если под этим именем еще ничего нет."""
+        if not self.es.indices.exists(index=alias):
+            name = self.create(alias, bulk_load=False)
+            self.es.indices.update_aliases(
+                body={"actions": [{"add": {"index": name, "alias": alias}}]}
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    manager = IndexManager(get_elastic())
+    for alias in sys.argv[1:] or ("movies", "persons", "genres"):
+        manager.ensure(alias)
@@ -1,85 +1,3 @@
-curl -XPUT http://127.0.0.1:9200/persons -H 'Content-Type: application/json' -d '{
-  "settings": {
-    "refresh_interval": "1s",
-    "analysis": {
-      "filter": {
-        "english_stop": {
-          "type":       "stop",
-          "stopwords":  "_english_"
-        },
-        "english_stemmer": {
-          "type": "stemmer",
-          "language": "english"
-        },
-        "english_possessive_stemmer": {
-          "type": "stemmer",
-          "language": "possessive_english"
-        },
-        "russian_stop": {
-          "type":       "stop",
-          "stopwords":  "_russian_"
-        },
-        "russian_stemmer": {
-          "type": "stemmer",
-          "language": "russian"
-        }
-      },
-      "analyzer": {
-        "ru_en": {
-          "tokenizer": "standard",
-          "filter": [
-            "lowercase",
-            "english_stop",
-            "english_stemmer",
-            "english_possessive_stemmer",
-            "russian_stop",
-            "russian_stemmer"
-          ]
-        }
-      }
-    }
-  },
-  "mappings": {
-    "dynamic": "strict",
-    "properties": {
-      "id": {
-        "type": "keyword"
-      },
-      "name": {
-        "type": "text",
-        "analyzer": "ru_en",
-        "fields": {
-          "raw": {
-            "type":  "keyword"
-          }
-        }
-      },
-      "roles": {
-        "type": "text",
-        "analyzer": "ru_en"
-      },
-      "modified": {
-        "type": "date"
-      },
-      "films": {
-        "type": "nested",
-        "dynamic": "strict",
-        "properties": {
-          "id": {
-            "type": "keyword"
-          },
-          "rating": {
-            "type": "float"
-          },
-          "type": {
-            "type": "keyword"
-          },
-          "title": {
-            "type": "text",
-            "analyzer": "ru_en"
-          }
-        }
-      }
-    }
-  }
-}'
\ No newline at end of file
+# Индекс без алиаса для ручного создания; ETL создает версионные индексы
+# с алиасом persons сам (см. index_manager.py).
+curl -XPUT http://127.0.0.1:9200/persons -H 'Content-Type: application/json' -d @"$(dirname "$0")/persons.json"
@@ -0,0 +1,71 @@
+import json
+import logging
+from typing import Iterable, Optional
+
+from redis import Redis, RedisError
+
+from config import CACHE_INVALIDATION, REDIS_HOST, REDIS_PORT
+
+# Формат ключей должен совпадать с ServiceMixin._build_cache_key в API.
+# У персоны два представления: полное и короткое для списков и карточки.
+CACHE_ID_KEYS = {
+    "movies": ("film_id",),
+    "persons": ("person_id", "person_short_id"),
+    "genres": ("genre_id",),
+}
+CHANNEL = "cache_invalidation"
+
+
+class CacheInvalidator:
+    """
+    Сброс кеша API после загрузки пачки: удаляются ключи документов по id,
+    а поколение индекса увеличивается, чтобы все закешированные списки
+    и результаты поиска по нему стали недействительными. Событие также
+    публикуется в канал, чтобы API мог сбросить свой локальный кеш.
+    """
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    def invalidate(self, index: str, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        keys = [
+            f"{index}:{name}:{doc_id}"
+            for name in CACHE_ID_KEYS[index]
+            for doc_id in ids
+        ]
+        self._publish(index, ids, keys)
+
+    def flush(self, index: str) -> None:
+        """Сбросить все документы индекса, например после полной переиндексации."""
+        try:
+            keys = [
+                key
+                for name in CACHE_ID_KEYS[index]
+                for key in self.redis.scan_iter(f"{index}:{name}:*", count=1000)
+            ]
+        except RedisError:
+            logging.warning("Failed to scan API cache for %s.", index, exc_info=True)
+            return
+        # ids=None в событии означает "весь индекс".
+        self._publish(index, None, keys)
+
+    def _publish(self, index: str, ids: Optional[list], keys: list) -> None:
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for start in range(0, len(keys), 1000):
+                pipe.delete(*keys[start:start + 1000])
+            pipe.incr(f"{index}:generation")
+            pipe.publish(CHANNEL, json.dumps({"index": index, "ids": ids}))
+            pipe.execute()
+        except RedisError:
+            # Кеш все равно истечет по TTL, загрузку из-за него не останавливаем.
+            logging.warning(
+                "Failed to invalidate API cache for %s.", index, exc_info=True
+            )
+
+
+def get_invalidator() -> Optional[CacheInvalidator]:
+    if not CACHE_INVALIDATION:
+        return None
+    return CacheInvalidator(Redis(host=REDIS_HOST, port=REDIS_PORT))
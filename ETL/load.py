@@ -0,0 +1,140 @@
+import logging
+from time import monotonic, sleep
+from typing import List
+
+import backoff
+from elasticsearch import Elasticsearch, ElasticsearchException, helpers
+from urllib3.exceptions import HTTPError
+
+import metrics
+from config import (
+    BULK_CHUNK_BYTES,
+    BULK_CHUNK_SIZE,
+    BULK_INITIAL_BACKOFF,
+    BULK_MAX_BACKOFF,
+    BULK_MAX_RETRIES,
+    ELASTIC_HOST,
+    ELASTIC_PORT,
+)
+from transform import Document
+
+# Ошибки, которые имеет смысл повторить: перегрузка кластера и сбои шардов.
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+
+
+class LoadError(Exception):
+    """Часть документов не удалось загрузить даже после повторов."""
+
+    def __init__(self, index, errors):
+        self.index = index
+        self.errors = errors
+        super().__init__(f"{len(errors)} documents failed to load into {index}")
+
+
+def get_elastic() -> Elasticsearch:
+    return Elasticsearch(f"{ELASTIC_HOST}:{ELASTIC_PORT}")
+
+
+class Load:
+    """
+    Загрузка документов в индекс через _bulk API.
+    Клиент Elasticsearch создается один раз и переиспользуется для всех пачек,
+    документы отправляются чанками, ограниченными по количеству и по размеру.
+    """
+
+    def __init__(self, es: Elasticsearch, ind, invalidator=None) -> None:
+        self.es = es
+        self.index = ind
+        self.invalidator = invalidator
+
+    def load(self, docs: List[Document]) -> int:
+        actions = [self._action(doc) for doc in docs]
+        if not actions:
+            return 0
+        started = monotonic()
+        errors = []
+        for attempt in range(BULK_MAX_RETRIES + 1):
+            if attempt:
+                delay = min(BULK_MAX_BACKOFF, BULK_INITIAL_BACKOFF * 2 ** (attempt - 1))
+                logging.warning(
+                    "Retrying %d failed documents for %s in %.1fs.",
+                    len(actions),
+                    self.index,
+                    delay,
+                )
+                sleep(delay)
+            actions, failed = self._bulk(actions)
+            errors.extend(failed)
+            if actions:
+                metrics.BULK_ERRORS.labels(self.index, "retry").inc(len(actions))
+            if not actions:
+                break
+        if errors or actions:
+            metrics.BULK_ERRORS.labels(self.index, "failed").inc(len(errors) + len(actions))
+            raise LoadError(self.index, errors + [{"_id": a["_id"]} for a in actions])
+        if self.invalidator:
+            self.invalidator.invalidate(self.index, [doc.id for doc in docs])
+        elapsed = monotonic() - started
+        metrics.STAGE_SECONDS.labels(self.index, "load").observe(elapsed)
+        metrics.BATCH_DOCS.labels(self.index).observe(len(docs))
+        metrics.DOCS_INDEXED.labels(self.index).inc(len(docs))
+        metrics.progress.add(self.index, len(docs))
+        logging.debug(
+            "Loaded %d documents into %s in %.2fs.", len(docs), self.index, elapsed
+        )
+        return len(docs)
+
+    def _action(self, doc: Document) -> dict:
+        # Тело уже сериализовано, JSONSerializer клиента отдает строки как есть.
+        return {
+            "_op_type": doc.op_type,
+            "_index": self.index,
+            "_type": "_doc",
+            "_id": doc.id,
+            "_source": doc.body,
+        }
+
+    @backoff.on_exception(
+        wait_gen=backoff.expo,
+        exception=(ElasticsearchException, HTTPError),
+        max_tries=10,
+    )
+    def _bulk(self, actions):
+        """
+        Отправить пачку и разделить неудачные документы на те,
+        которые можно повторить, и окончательные ошибки.
+        """
+        retry, errors = [], []
+        kwargs = {}
+        if self.invalidator:
+            # Кеш API сбрасывается только когда документы уже видны в поиске,
+            # иначе API успеет закешировать старые списки под новым поколением.
+            # wait_for ждет плановый refresh вместо создания сегмента на пачку.
+            kwargs["refresh"] = "wait_for"
+        results = helpers.streaming_bulk(
+            self.es,
+            # streaming_bulk изменяет переданные действия, поэтому отдаем копии.
+            (dict(action) for action in actions),
+            chunk_size=BULK_CHUNK_SIZE,
+            max_chunk_bytes=BULK_CHUNK_BYTES,
+            raise_on_error=False,
+            **kwargs,
+        )
+        for action, (ok, result) in zip(actions, results):
+            if ok:
+                continue
+            op_type, item = next(iter(result.items()))
+            if op_type == "update" and item.get("status") == 404:
+                # Фильм еще не проиндексирован, он придет в индекс целиком.
+                continue
+            if item.get("status") in RETRYABLE_STATUSES:
+                retry.append(action)
+            else:
+                logging.error(
+                    "Failed to load %s into %s: %s",
+                    item.get("_id"),
+                    self.index,
+                    item.get("error"),
+                )
+                errors.append(item)
+        return retry, errors
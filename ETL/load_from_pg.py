@@ -1,153 +1,107 @@
 import logging
-import os
-from time import sleep
+import signal
+from functools import partial
 
 import backoff
 import psycopg2
-from dotenv import load_dotenv
-from elasticsearch import Elasticsearch, ElasticsearchException
 from psycopg2.extras import DictCursor
 
-from queries import FW_QUERY, GENRE_QUERY, PERSON_QUERY, counts
-from state import JsonFileStorage, State
-from urllib3.exceptions import HTTPError
+from backfill import backfill, needs_backfill
+from changes import ChangeListener, Poller
+from config import BACKFILL, CHANGE_MODE, DSL, PIPELINE
+from extract import Extraction, get_extraction
+from index_manager import IndexManager
+from invalidation import get_invalidator
+from load import Load, LoadError, get_elastic
+from metrics import STAGE_SECONDS, lag, start_metrics_server, timed_batches
+from pipeline import Pipeline
+from queries import FW_BY_IDS_QUERY, GENRE_BY_IDS_QUERY, PERSON_BY_IDS_QUERY
+from state import State, get_storage
+from transform import Transform
 
 logging.basicConfig(level=logging.INFO)
-load_dotenv()
-BATCH_SIZE = 100
 
-
-class Extraction:
-    def __init__(self, conn, query_db) -> None:
-        self.cursor = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        self.query = query_db
-
-    @backoff.on_exception(
-        wait_gen=backoff.expo, exception=(psycopg2.Error, psycopg2.OperationalError)
-    )
-    def extract(self, modified):
-        self.cursor.execute(self.query % tuple([modified] * counts[self.query]))
-        logging.info("Data extracted.")
-        while batch := self.cursor.fetchmany(BATCH_SIZE):
-            yield from batch
-
-
-class Transform:
-    def __init__(self, conn, ind, data_l) -> None:
-        self.data = data_l
-        self.index = ind
-        self.cursor = conn.cursor()
-
-    def transform(self):
-        res = {}
-        d = self.data
-        if self.index == "movies":
-            directors = [
-                {"id": el["person_id"], "name": el["person_name"]}
-                for el in d["persons"]
-                if el["person_role"] == "director"
-            ]
-            writers = [
-                {"id": el["person_id"], "name": el["person_name"]}
-                for el in d["persons"]
-                if el["person_role"] == "writer"
-            ]
-            actors = [
-                {"id": el["person_id"], "name": el["person_name"]}
-                for el in d["persons"]
-                if el["person_role"] == "actor"
-            ]
-            genres = [{"id": el["g_id"], "name": el["g_name"]} for el in d["genres"]]
-            res = {
-                "id": d["id"],
-                "title": d["title"],
-                "description": d["description"],
-                "type": d["type"],
-                "creation_date": d["created"],
-                "rating": d["rating"],
-                "modified": d["modified"],
-                "directors": directors,
-                "writers": writers,
-                "actors": actors,
-                "genres": genres,
-            }
-        elif self.index == "genres":
-            res = {
-                "id": d["genre_id"],
-                "name": d["genre_name"],
-                "description": d["genre_description"],
-                "modified": d["modified"],
-            }
-        elif self.index == "persons":
-            roles = ", ".join(d["roles"])
-            films = [
-                {
-                    "id": el["fw_id"],
-                    "rating": el["fw_rating"],
-                    "title": el["fw_title"],
-                    "type": "fw_type",
-                }
-                for el in d["films"]
-            ]
-            res = {
-                "id": d["id"],
-                "name": d["full_name"],
-                "modified": d["modified"],
-                "roles": roles,
-                "films": films,
-            }
-        return res
-
-
-class Load:
-    def __init__(self, conn, ind, data_from_t) -> None:
-        self.data = data_from_t
-        self.index = ind
-        self.cursor = conn.cursor()
-        host = os.getenv("ELASTIC_HOST", "localhost")
-        port = os.getenv("ELASTIC_PORT", "9200")
-        self.es = Elasticsearch(f"{host}:{port}")
-
-    @backoff.on_exception(
-        wait_gen=backoff.expo,
-        exception=(ElasticsearchException, HTTPError),
-        max_tries=10,
-    )
-    def load_data(self):
-        self.es.index(
-            index=self.index, id=self.data["id"], body=self.data, doc_type="_doc"
-        )
-        logging.info("Data loaded.")
+INDEXES = ("genres", "persons", "movies")
+BY_IDS_QUERIES = {
+    "genres": GENRE_BY_IDS_QUERY,
+    "persons": PERSON_BY_IDS_QUERY,
+    "movies": FW_BY_IDS_QUERY,
+}
+# Индексы, которые ETL_BACKFILL=1 требует переиндексировать. Законченная
+# переиндексация убирается отсюда, чтобы повтор main ее не запускал заново.
+forced_backfill = set(INDEXES) if BACKFILL else set()
+
+
+def sync_index(pg_conn, es, state: State, index: str, invalidator=None) -> int:
+    """Последовательная синхронизация одного индекса."""
+    transformer = Transform(index)
+    loader = Load(es, index, invalidator)
+    loaded = 0
+    batches = get_extraction(pg_conn, index).batches(state)
+    for batch, checkpoint in timed_batches(index, batches):
+        with STAGE_SECONDS.labels(index, "transform").time():
+            docs = transformer.transform(batch)
+        # Чекпоинт пишется один раз на пачку и только после успешной загрузки.
+        loaded += loader.load(docs)
+        if checkpoint:
+            state.set_states(checkpoint)
+            lag.checkpoint(index, checkpoint)
+    return loaded
+
+
+def sync_ids(pg_conn, es, index: str, ids, invalidator=None) -> int:
+    """Перезагрузить конкретные документы, не трогая чекпоинт индекса."""
+    e = Extraction(pg_conn, index, BY_IDS_QUERIES[index])
+    transformer = Transform(index)
+    loader = Load(es, index, invalidator)
+    loaded = 0
+    for batch in timed_batches(index, e.extract(ids=sorted(ids))):
+        with STAGE_SECONDS.labels(index, "transform").time():
+            docs = transformer.transform(batch)
+        loaded += loader.load(docs)
+    return loaded
 
 
 @backoff.on_exception(
     wait_gen=backoff.expo,
-    exception=psycopg2.OperationalError,
+    exception=(psycopg2.OperationalError, LoadError),
     max_tries=5,
 )
 def main():
-    state = State(JsonFileStorage("state.json"))
-    dsl = {
-        "dbname": os.getenv("DB_NAME", "movies_database"),
-        "user": os.getenv("DB_USER", "app"),
-        "password": os.getenv("DB_PASSWORD", "123qwe"),
-        "host": os.getenv("DB_HOST", "localhost"),
-        "port": os.getenv("DB_PORT", 5432),
-    }
-    queries = {"genres": GENRE_QUERY, "persons": PERSON_QUERY, "movies": FW_QUERY}
-    with psycopg2.connect(**dsl, cursor_factory=DictCursor) as pg_conn:
+    state = State(get_storage())
+    es = get_elastic()
+    invalidator = get_invalidator()
+    with psycopg2.connect(**DSL, cursor_factory=DictCursor) as pg_conn:
         logging.info("PostgreSQL connection is open. Start load movies data.")
-        while True:
-            for index, query in queries.items():
-                e = Extraction(pg_conn, query)
-                state_key = f"{index}_modified"
-                last_modified = state.get_state(state_key)
-                for data in e.extract(last_modified):
-                    data_t = Transform(pg_conn, index, data).transform()
-                    Load(pg_conn, index, data_t).load_data()
-                    state.set_state(state_key, data_t["modified"].isoformat())
-            sleep(1)
+        manager = IndexManager(es)
+        for index in INDEXES:
+            if index in forced_backfill or needs_backfill(state, index):
+                backfill(pg_conn, state, index, invalidator=invalidator)
+                forced_backfill.discard(index)
+            else:
+                manager.ensure(index)
+        pipeline = None
+        if PIPELINE:
+            pipeline = Pipeline(pg_conn, es, state, invalidator)
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(sig, lambda *_: pipeline.stop())
+            sync = pipeline.run
+        else:
+            sync = partial(sync_index, pg_conn, es, state, invalidator=invalidator)
+        watcher = ChangeListener(DSL) if CHANGE_MODE == "notify" else Poller()
+        while not (pipeline and pipeline.stopped):
+            changes = watcher.wait()
+            loaded = 0
+            for index in INDEXES:
+                if index in changes.indexes:
+                    loaded += sync(index)
+                    lag.caught_up(index)
+            for index, ids in changes.ids.items():
+                loaded += sync_ids(pg_conn, es, index, ids, invalidator)
+            watcher.done(loaded)
 
 
 if __name__ == "__main__":
+    # Сервер метрик запускается один раз, а не при каждом перезапуске main через backoff.
+    start_metrics_server()
     main()
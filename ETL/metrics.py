@@ -0,0 +1,119 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from time import monotonic, perf_counter
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from config import METRICS_PORT, PROGRESS_INTERVAL
+
+STAGE_SECONDS = Histogram(
+    "etl_stage_seconds",
+    "Время обработки одной пачки стадией ETL.",
+    ["index", "stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+BATCH_DOCS = Histogram(
+    "etl_batch_docs",
+    "Количество документов в пачке.",
+    ["index"],
+    buckets=(1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+DOCS_INDEXED = Counter(
+    "etl_docs_indexed", "Загруженные в elasticsearch документы.", ["index"]
+)
+BULK_ERRORS = Counter(
+    "etl_bulk_errors",
+    "Ошибки документов в _bulk: retry - повторенные, failed - окончательные.",
+    ["index", "kind"],
+)
+LAG_SECONDS = Gauge(
+    "etl_lag_seconds",
+    "Отставание: текущее время минус modified последнего чекпоинта индекса.",
+    ["index"],
+)
+
+
+class Lag:
+    """
+    Отставание индекса считается в момент сбора метрик. После того как
+    проход синхронизации дочитал источник до конца, индекс догнал базу
+    и отставание равно нулю, пока не появятся новые изменения.
+    """
+
+    def __init__(self):
+        self._modified = {}
+        self._lock = threading.Lock()
+
+    def checkpoint(self, index: str, checkpoint: dict) -> None:
+        values = [v for k, v in checkpoint.items() if k.endswith("_modified") and v]
+        if not values:
+            return
+        modified = min(datetime.fromisoformat(value) for value in values)
+        with self._lock:
+            if index not in self._modified:
+                LAG_SECONDS.labels(index).set_function(lambda: self.seconds(index))
+            self._modified[index] = modified
+
+    def caught_up(self, index: str) -> None:
+        with self._lock:
+            self._modified[index] = None
+
+    def seconds(self, index: str) -> float:
+        modified = self._modified.get(index)
+        if modified is None:
+            return 0
+        return max(0.0, (datetime.now(timezone.utc) - modified).total_seconds())
+
+
+class Progress:
+    """
+    Сводка о ходе загрузки в лог не чаще одного раза в interval секунд
+    вместо строки на каждую пачку.
+    """
+
+    def __init__(self, interval: float = PROGRESS_INTERVAL):
+        self.interval = interval
+        self._docs = {}
+        self._lock = threading.Lock()
+        self._since = monotonic()
+
+    def add(self, index: str, docs: int) -> None:
+        with self._lock:
+            self._docs[index] = self._docs.get(index, 0) + docs
+            elapsed = monotonic() - self._since
+            if elapsed < self.interval:
+                return
+            docs, self._docs, self._since = self._docs, {}, monotonic()
+        logging.info(
+            "Loaded in the last %.0fs: %s.",
+            elapsed,
+            ", ".join(
+                f"{ind} {count} docs ({count / elapsed:.0f} docs/sec, lag {lag.seconds(ind):.0f}s)"
+                for ind, count in docs.items()
+            ),
+        )
+
+
+lag = Lag()
+progress = Progress()
+
+
+def timed_batches(index: str, batches):
+    """Пачки из Extraction с замером времени чтения каждой из них."""
+    try:
+        while True:
+            started = perf_counter()
+            item = next(batches, None)
+            if item is None:
+                return
+            STAGE_SECONDS.labels(index, "extract").observe(perf_counter() - started)
+            yield item
+    finally:
+        batches.close()
+
+
+def start_metrics_server() -> None:
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+        logging.info("Metrics are served on port %d.", METRICS_PORT)
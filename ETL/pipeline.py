@@ -0,0 +1,200 @@
+import logging
+import threading
+from queue import Empty, Full, Queue
+
+from config import (
+    PIPELINE_LOAD_WORKERS,
+    PIPELINE_QUEUE_SIZE,
+    PIPELINE_TRANSFORM_WORKERS,
+)
+from extract import get_extraction
+from load import Load
+from metrics import STAGE_SECONDS, lag, timed_batches
+from state import State
+from transform import Transform
+
+# Маркер окончания данных для воркеров стадии.
+_DONE = object()
+
+
+class Checkpointer:
+    """
+    Продвигает состояние только по непрерывному префиксу загруженных пачек.
+    Загрузчики работают параллельно и завершают пачки не по порядку,
+    поэтому чекпоинт пачки N пишется только когда загружены все пачки до N.
+    """
+
+    def __init__(self, state: State, index: str):
+        self.state = state
+        self.index = index
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._next_seq = 0
+
+    def done(self, seq: int, checkpoint: dict) -> None:
+        with self._lock:
+            self._pending[seq] = checkpoint
+            checkpoint = {}
+            while self._next_seq in self._pending:
+                checkpoint.update(self._pending.pop(self._next_seq))
+                self._next_seq += 1
+            if checkpoint:
+                self.state.set_states(checkpoint)
+                lag.checkpoint(self.index, checkpoint)
+
+
+class Pipeline:
+    """
+    Конкурентный режим ETL: извлечение, трансформация и загрузка работают
+    в отдельных потоках и связаны ограниченными очередями. Когда загрузка
+    не успевает, очереди заполняются и извлечение ждет (backpressure),
+    поэтому в памяти находится не больше queue_size пачек на стадию.
+    """
+
+    def __init__(
+        self,
+        pg_conn,
+        es,
+        state: State,
+        invalidator=None,
+        transform_workers: int = PIPELINE_TRANSFORM_WORKERS,
+        load_workers: int = PIPELINE_LOAD_WORKERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+    ):
+        self.pg_conn = pg_conn
+        self.es = es
+        self.state = state
+        self.invalidator = invalidator
+        self.transform_workers = transform_workers
+        self.load_workers = load_workers
+        self.queue_size = queue_size
+        self._stop = threading.Event()
+        self._failed = threading.Event()
+        self._errors = []
+        self._loaded = 0
+        # Счетчик общий для всех потоков загрузки.
+        self._loaded_lock = threading.Lock()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def stop(self) -> None:
+        """
+        Мягкая остановка: новые пачки больше не читаются, а уже прочитанные
+        дотрансформируются и загружаются, после чего сохраняется чекпоинт.
+        """
+        logging.info("Pipeline stop requested, draining in-flight batches.")
+        self._stop.set()
+
+    def run(self, index: str) -> int:
+        extracted, transformed = Queue(self.queue_size), Queue(self.queue_size)
+        checkpointer = Checkpointer(self.state, index)
+        self._loaded = 0
+        transformers = self._start(
+            self.transform_workers, self._transform, index, extracted, transformed
+        )
+        loaders = self._start(
+            self.load_workers, self._load, index, transformed, checkpointer
+        )
+        try:
+            self._extract(index, extracted)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._finish(extracted, transformers)
+            self._finish(transformed, loaders)
+        if self._errors:
+            error, self._errors = self._errors[0], []
+            self._failed.clear()
+            raise error
+        return self._loaded
+
+    def _start(self, count, target, *args):
+        threads = [
+            threading.Thread(target=self._worker, args=(target, *args), daemon=True)
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _finish(self, queue: Queue, threads) -> None:
+        for _ in threads:
+            self._put(queue, _DONE, force=True)
+        for thread in threads:
+            thread.join()
+
+    def _extract(self, index, extracted: Queue) -> None:
+        batches = timed_batches(
+            index, get_extraction(self.pg_conn, index).batches(self.state)
+        )
+        try:
+            for seq, batch in enumerate(batches):
+                if self._stop.is_set() or self._failed.is_set():
+                    break
+                if not self._put(extracted, (seq, batch)):
+                    break
+        finally:
+            batches.close()
+
+    def _transform(self, index, extracted: Queue, transformed: Queue) -> None:
+        transformer = Transform(index)
+        while (item := self._get(extracted)) is not _DONE:
+            seq, (batch, checkpoint) = item
+            with STAGE_SECONDS.labels(index, "transform").time():
+                docs = transformer.transform(batch)
+            self._put(transformed, (seq, docs, checkpoint))
+
+    def _load(self, index, transformed: Queue, checkpointer: Checkpointer) -> None:
+        loader = Load(self.es, index, self.invalidator)
+        while (item := self._get(transformed)) is not _DONE:
+            seq, docs, checkpoint = item
+            loaded = loader.load(docs)
+            with self._loaded_lock:
+                self._loaded += loaded
+            checkpointer.done(seq, checkpoint)
+
+    def _worker(self, target, *args) -> None:
+        try:
+            target(*args)
+        except Exception as e:
+            self._fail(e)
+
+    def _fail(self, error: Exception) -> None:
+        logging.exception("Pipeline stage failed.", exc_info=error)
+        self._errors.append(error)
+        self._failed.set()
+
+    def _put(self, queue: Queue, item, force: bool = False) -> bool:
+        """
+        Положить в очередь с ожиданием места. После сбоя одной из стадий
+        обычные элементы больше не ставятся, чтобы не блокироваться навсегда.
+        """
+        while force or not self._failed.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                if force and self._failed.is_set():
+                    self._drain(queue)
+        return False
+
+    def _get(self, queue: Queue):
+        while True:
+            try:
+                item = queue.get(timeout=0.1)
+            except Empty:
+                continue
+            if self._failed.is_set() and item is not _DONE:
+                # Стадия упала: дочитываем очередь до маркера, ничего не загружая.
+                continue
+            return item
+
+    @staticmethod
+    def _drain(queue: Queue) -> None:
+        try:
+            while True:
+                queue.get_nowait()
+        except Empty:
+            pass
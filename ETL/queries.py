@@ -1,4 +1,4 @@
-FW_QUERY = """SELECT
+FW_SELECT = """SELECT
    fw.id,
    fw.title,
    fw.description,
@@ -25,19 +25,23 @@ FW_QUERY = """SELECT
        ) FILTER (WHERE g.id is not null),
        '[]'
    ) as genres
-   
 FROM content.film_work fw
 LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
 LEFT JOIN content.person p ON p.id = pfw.person_id
 LEFT JOIN content.genre_film_work gfw ON gfw.film_work_id = fw.id
 LEFT JOIN content.genre g ON g.id = gfw.genre_id
-WHERE fw.modified > '%s' or p.id in (SELECT id FROM content.person WHERE modified > '%s' ORDER BY modified)
-or g.id in (SELECT id FROM content.genre WHERE modified > '%s' ORDER BY modified)
+"""
+
+# Прежний однофазный запрос изменений: OR по подзапросам не дает планировщику
+# использовать индексы. Оставлен для сравнения в explain_queries.py.
+FW_QUERY = FW_SELECT + """WHERE (fw.modified, fw.id) > (%(modified)s::timestamptz, %(id)s::uuid)
+or p.id in (SELECT id FROM content.person WHERE modified > %(modified)s::timestamptz)
+or g.id in (SELECT id FROM content.genre WHERE modified > %(modified)s::timestamptz)
 GROUP BY fw.id
-ORDER BY fw.modified"""
+ORDER BY fw.modified, fw.id"""
 
 
-PERSON_QUERY = """
+PERSON_SELECT = """
 SELECT
     p.id,
     p.full_name,
@@ -57,19 +61,113 @@ SELECT
 FROM content.person p
 LEFT JOIN content.person_film_work pfw ON pfw.person_id = p.id
 LEFT JOIN content.film_work fw ON fw.id = pfw.film_work_id
-WHERE p.modified > '%s'
+"""
+
+PERSON_QUERY = PERSON_SELECT + """WHERE (p.modified, p.id) > (%(modified)s::timestamptz, %(id)s::uuid)
 GROUP BY p.id
-ORDER BY p.modified"""
+ORDER BY p.modified, p.id"""
 
 
-GENRE_QUERY = """
+GENRE_SELECT = """
 SELECT
-    g.id as genre_id,
+    g.id,
     g.name as genre_name,
     g.description as genre_description,
-    g.modified 
+    g.modified
 FROM content.genre g
-WHERE g.modified > '%s';
 """
 
-counts = {FW_QUERY: 3, PERSON_QUERY: 1, GENRE_QUERY: 1}
+GENRE_QUERY = GENRE_SELECT + """WHERE (g.modified, g.id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY g.modified, g.id
+"""
+
+
+# Запросы полной переиндексации: каждый воркер читает свой диапазон UUID
+# [lower, upper] по первичному ключу, позиция внутри диапазона - последний id.
+FW_BACKFILL_QUERY = FW_SELECT + """WHERE fw.id BETWEEN %(lower)s::uuid AND %(upper)s::uuid
+and fw.id > %(id)s::uuid
+GROUP BY fw.id
+ORDER BY fw.id"""
+
+PERSON_BACKFILL_QUERY = PERSON_SELECT + """WHERE p.id BETWEEN %(lower)s::uuid AND %(upper)s::uuid
+and p.id > %(id)s::uuid
+GROUP BY p.id
+ORDER BY p.id"""
+
+GENRE_BACKFILL_QUERY = GENRE_SELECT + """WHERE g.id BETWEEN %(lower)s::uuid AND %(upper)s::uuid
+and g.id > %(id)s::uuid
+ORDER BY g.id
+"""
+
+# Перезагрузка конкретных документов, например при изменении связей
+# фильм-персона, которые не меняют modified ни у фильма, ни у персоны.
+FW_BY_IDS_QUERY = FW_SELECT + """WHERE fw.id = ANY(%(ids)s::uuid[])
+GROUP BY fw.id
+ORDER BY fw.id"""
+
+PERSON_BY_IDS_QUERY = PERSON_SELECT + """WHERE p.id = ANY(%(ids)s::uuid[])
+GROUP BY p.id
+ORDER BY p.id"""
+
+GENRE_BY_IDS_QUERY = GENRE_SELECT + """WHERE g.id = ANY(%(ids)s::uuid[])
+ORDER BY g.id
+"""
+
+# Двухфазная загрузка фильмов. Первая фаза - дешевые индексные запросы,
+# которые страницами по (modified, id) находят измененные фильмы, персоны
+# и жанры и переводят их в id фильмов. Вторая фаза - FW_BY_IDS_QUERY.
+FW_CHANGED_QUERY = """
+SELECT id, modified
+FROM content.film_work
+WHERE (modified, id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY modified, id
+LIMIT %(limit)s
+"""
+
+PERSON_CHANGED_QUERY = """
+SELECT id, modified
+FROM content.person
+WHERE (modified, id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY modified, id
+LIMIT %(limit)s
+"""
+
+GENRE_CHANGED_QUERY = """
+SELECT id, modified
+FROM content.genre
+WHERE (modified, id) > (%(modified)s::timestamptz, %(id)s::uuid)
+ORDER BY modified, id
+LIMIT %(limit)s
+"""
+
+FW_IDS_BY_PERSONS_QUERY = """
+SELECT DISTINCT film_work_id AS id
+FROM content.person_film_work
+WHERE person_id = ANY(%(ids)s::uuid[])
+"""
+
+FW_IDS_BY_GENRES_QUERY = """
+SELECT DISTINCT film_work_id AS id
+FROM content.genre_film_work
+WHERE genre_id = ANY(%(ids)s::uuid[])
+"""
+
+# Связи измененных персон и жанров с фильмами для точечного обновления имен
+# в уже проиндексированных фильмах (ETL_PARTIAL_UPDATES).
+FW_PERSON_LINKS_QUERY = """
+SELECT DISTINCT pfw.film_work_id, p.id, p.full_name AS name
+FROM content.person_film_work pfw
+JOIN content.person p ON p.id = pfw.person_id
+WHERE pfw.person_id = ANY(%(ids)s::uuid[])
+ORDER BY pfw.film_work_id
+"""
+
+FW_GENRE_LINKS_QUERY = """
+SELECT DISTINCT gfw.film_work_id, g.id, g.name
+FROM content.genre_film_work gfw
+JOIN content.genre g ON g.id = gfw.genre_id
+WHERE gfw.genre_id = ANY(%(ids)s::uuid[])
+ORDER BY gfw.film_work_id
+"""
+
+LAST_MODIFIED_QUERY = "SELECT max(modified) FROM {table}"
@@ -0,0 +1,9 @@
+-- Индексы для инкрементальной загрузки ETL: keyset-пагинация по (modified, id)
+-- и переход от персон и жанров к фильмам по таблицам связей.
+CREATE INDEX IF NOT EXISTS film_work_modified_id_idx ON content.film_work (modified, id);
+CREATE INDEX IF NOT EXISTS person_modified_id_idx ON content.person (modified, id);
+CREATE INDEX IF NOT EXISTS genre_modified_id_idx ON content.genre (modified, id);
+CREATE INDEX IF NOT EXISTS person_film_work_person_id_idx ON content.person_film_work (person_id);
+CREATE INDEX IF NOT EXISTS person_film_work_film_work_id_idx ON content.person_film_work (film_work_id);
+CREATE INDEX IF NOT EXISTS genre_film_work_genre_id_idx ON content.genre_film_work (genre_id);
+CREATE INDEX IF NOT EXISTS genre_film_work_film_work_id_idx ON content.genre_film_work (film_work_id);
@@ -1,7 +1,16 @@
 import abc
+import fcntl
 import json
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
 from typing import Any, Optional
 
+from redis import Redis
+
+from config import REDIS_HOST, REDIS_PORT, STATE_KEY, STATE_PATH, STATE_STORAGE
+
 
 class BaseStorage:
     @abc.abstractmethod
@@ -14,6 +23,19 @@ class BaseStorage:
         """Загрузить состояние локально из постоянного хранилища"""
         pass
 
+    def update_state(self, values: dict) -> None:
+        """Обновить часть ключей, не затрагивая ключи других воркеров"""
+        state = self.retrieve_state()
+        state.update(values)
+        self.save_state(state)
+
+    def delete_state(self, keys: list) -> None:
+        """Удалить ключи, которые больше не нужны"""
+        state = self.retrieve_state()
+        for key in keys:
+            state.pop(key, None)
+        self.save_state(state)
+
 
 class JsonFileStorage(BaseStorage):
     def __init__(self, file_path: Optional[str] = None):
@@ -23,8 +45,24 @@ class JsonFileStorage(BaseStorage):
         if self.file_path is None:
             raise Exception("File not found")
 
-        with open(self.file_path, "w") as f:
-            json.dump(state, f)
+        # Пишем во временный файл рядом и атомарно подменяем им старый,
+        # чтобы падение посреди записи не оставило поврежденный state.json.
+        directory = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
 
     def retrieve_state(self) -> dict:
         if self.file_path is None:
@@ -37,6 +75,94 @@ class JsonFileStorage(BaseStorage):
             self.save_state({})
             return {}
 
+    def update_state(self, values: dict) -> None:
+        with self._lock():
+            super().update_state(values)
+
+    def delete_state(self, keys: list) -> None:
+        with self._lock():
+            super().delete_state(keys)
+
+    @contextmanager
+    def _lock(self):
+        with open(f"{self.file_path}.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class SqliteStorage(BaseStorage):
+    """Состояние в таблице SQLite, общей для нескольких воркеров на одной машине."""
+
+    def __init__(self, db_path: str, table: str = "etl_state"):
+        self.table = table
+        self.conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def save_state(self, state: dict) -> None:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute(f"DELETE FROM {self.table}")
+            self._upsert(state)
+
+    def retrieve_state(self) -> dict:
+        rows = self.conn.execute(f"SELECT key, value FROM {self.table}")
+        return {key: json.loads(value) for key, value in rows}
+
+    def update_state(self, values: dict) -> None:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._upsert(values)
+
+    def delete_state(self, keys: list) -> None:
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in keys]
+            )
+
+    def _upsert(self, values: dict) -> None:
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in values.items()],
+        )
+
+
+class RedisStorage(BaseStorage):
+    """Состояние в хэше Redis, доступное воркерам на разных машинах."""
+
+    def __init__(self, redis, key: str = "etl_state"):
+        self.redis = redis
+        self.key = key
+
+    def save_state(self, state: dict) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(self.key)
+        if state:
+            pipe.hset(self.key, mapping=self._dump(state))
+        pipe.execute()
+
+    def retrieve_state(self) -> dict:
+        data = self.redis.hgetall(self.key)
+        return {key.decode(): json.loads(value) for key, value in data.items()}
+
+    def update_state(self, values: dict) -> None:
+        if values:
+            self.redis.hset(self.key, mapping=self._dump(values))
+
+    def delete_state(self, keys: list) -> None:
+        if keys:
+            self.redis.hdel(self.key, *keys)
+
+    @staticmethod
+    def _dump(values: dict) -> dict:
+        return {key: json.dumps(value) for key, value in values.items()}
+
 
 class State:
     """
@@ -50,8 +176,26 @@ class State:
         self.state = storage.retrieve_state()
 
     def set_state(self, key: str, value: any) -> None:
-        self.state[key] = value
-        self.storage.save_state(self.state)
+        self.set_states({key: value})
+
+    def set_states(self, values: dict) -> None:
+        """Сохранить несколько ключей одной записью, например чекпоинт пачки"""
+        self.state.update(values)
+        self.storage.update_state(values)
+
+    def delete_states(self, keys: list) -> None:
+        """Удалить ключи, например позиции законченной переиндексации"""
+        for key in keys:
+            self.state.pop(key, None)
+        self.storage.delete_state(keys)
 
     def get_state(self, key: str) -> Any:
         return self.state.get(key)
+
+
+def get_storage() -> BaseStorage:
+    if STATE_STORAGE == "sqlite":
+        return SqliteStorage(STATE_PATH or "state.sqlite3")
+    if STATE_STORAGE == "redis":
+        return RedisStorage(Redis(host=REDIS_HOST, port=REDIS_PORT), STATE_KEY)
+    return JsonFileStorage(STATE_PATH or "state.json")
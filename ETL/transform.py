@@ -0,0 +1,115 @@
+from typing import Callable, Dict, List, NamedTuple
+
+import orjson
+
+# Обновляет имена во вложенных списках фильма по id, не трогая остальной документ.
+RENAME_SCRIPT = """
+boolean changed = false;
+for (field in params.fields) {
+    if (ctx._source[field] == null) {
+        continue;
+    }
+    for (item in ctx._source[field]) {
+        def name = params.names[item.id];
+        if (name != null && name != item.name) {
+            item.name = name;
+            changed = true;
+        }
+    }
+}
+if (!changed) {
+    ctx.op = 'noop';
+}
+"""
+
+
+class Document(NamedTuple):
+    """Документ, готовый к отправке в _bulk: тело уже сериализовано в JSON."""
+
+    id: str
+    body: str
+    op_type: str = "index"
+
+
+class Transform:
+    """
+    Трансформация пачки строк postgres в документы elasticsearch.
+    Каждая строка проходится один раз и сразу сериализуется orjson,
+    поэтому клиенту elasticsearch остается только склеить тело запроса.
+    """
+
+    def __init__(self, ind) -> None:
+        self.index = ind
+        self._transformers: Dict[str, Callable[[dict], Document]] = {
+            "movies": self._movie,
+            "genres": self._genre,
+            "persons": self._person,
+        }
+
+    def transform(self, batch) -> List[Document]:
+        transform_row = self._transformers[self.index]
+        return [transform_row(row) for row in batch]
+
+    def _movie(self, d) -> Document:
+        if "names" in d:
+            return self._rename(d)
+        roles = {"director": [], "writer": [], "actor": []}
+        for el in d["persons"]:
+            persons = roles.get(el["person_role"])
+            if persons is not None:
+                persons.append({"id": el["person_id"], "name": el["person_name"]})
+        res = {
+            "id": d["id"],
+            "title": d["title"],
+            "description": d["description"],
+            "type": d["type"],
+            "creation_date": d["created"],
+            "rating": d["rating"],
+            "modified": d["modified"],
+            "directors": roles["director"],
+            "writers": roles["writer"],
+            "actors": roles["actor"],
+            "genres": [{"id": el["g_id"], "name": el["g_name"]} for el in d["genres"]],
+        }
+        return Document(d["id"], orjson.dumps(res).decode())
+
+    @staticmethod
+    def _rename(d) -> Document:
+        res = {
+            "script": {
+                "source": RENAME_SCRIPT,
+                "lang": "painless",
+                "params": {"fields": list(d["fields"]), "names": d["names"]},
+            },
+        }
+        return Document(d["id"], orjson.dumps(res).decode(), "update")
+
+    @staticmethod
+    def _genre(d) -> Document:
+        res = {
+            "id": d["id"],
+            "name": d["genre_name"],
+            "description": d["genre_description"],
+            "modified": d["modified"],
+        }
+        return Document(d["id"], orjson.dumps(res).decode())
+
+    @staticmethod
+    def _person(d) -> Document:
+        res = {
+            "id": d["id"],
+            "name": d["full_name"],
+            "modified": d["modified"],
+            # У персоны без фильмов array_agg по ролям возвращает [NULL].
+            "roles": ", ".join(role for role in d["roles"] if role),
+            "films": [
+                {
+                    "id": el["fw_id"],
+                    "rating": el["fw_rating"],
+                    "title": el["fw_title"],
+                    "type": el["fw_type"],
+                }
+                for el in d["films"]
+            ],
+        }
+        return Document(d["id"], orjson.dumps(res).decode())
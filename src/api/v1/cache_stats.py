@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+
+from services import cache
+
+router = APIRouter()
+
+
+@router.get("/stats", description="Статистика локального кеша процесса")
+async def cache_stats() -> dict:
+    return {
+        "subscribed": cache.subscribed,
+        "single_flight": cache.single_flight.stats(),
+        "caches": {
+            index: local_cache.stats()
+            for index, local_cache in cache.local_caches.items()
+        },
+    }
@@ -1,98 +1,184 @@
-import enum
 from http import HTTPStatus
-from typing import Optional
-
-from fastapi import APIRouter, Depends, HTTPException
-
-from models.data_models import Film, FilmForPerson
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from core.config import settings
+from models.data_models import (
+    Film,
+    FilmFacets,
+    FilmFilter,
+    FilmForPerson,
+    FilmPage,
+    FilmSuggestion,
+    IdList,
+)
+from models.enums import SortTypes
+from models.projection import FieldsError, parse_fields
+from services import genre_catalogue
 from services.films import FilmService, get_film_service
-
-from fastapi_pagination import Page, add_pagination, paginate
-
+from services.suggest import SuggestService, get_film_suggest_service
+from services.tools import PageError
 
 router = APIRouter()
 
 
-@router.get(
-    "/search", response_model=Page[FilmForPerson], description="Поиск по фильмам"
-)
+class PageParams:
+    """
+    Номер и размер страницы в параметрах page и size, как было у
+    fastapi_pagination. Для страниц глубже MAX_RESULT_WINDOW
+    передается page_token из next_page_token предыдущей страницы.
+    """
+
+    def __init__(
+        self,
+        page_number: int = Query(1, ge=1, alias="page"),
+        page_size: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=100, alias="size"),
+        page_token: Optional[str] = None,
+    ):
+        self.page_number = page_number
+        self.page_size = page_size
+        self.page_token = page_token
+
+
+def sparse_fields(
+    fields: Optional[str] = Query(
+        None, description="Поля элементов через запятую, например id,title"
+    )
+) -> tuple[str, ...]:
+    try:
+        return parse_fields(FilmForPerson, fields)
+    except FieldsError as e:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=str(e))
+
+
+def film_filter(
+    filter: Optional[List[str]] = Query(
+        None, description="Жанры, можно несколько: ?filter=Drama&filter=Comedy"
+    ),
+    rating_min: Optional[float] = Query(None, ge=0),
+    rating_max: Optional[float] = Query(None, ge=0),
+    type: Optional[List[str]] = Query(None, description="Типы, можно несколько"),
+) -> FilmFilter:
+    """Фильтр списка фильмов. Жанры сверяются с каталогом и берутся из него."""
+    if rating_min is not None and rating_max is not None and rating_min > rating_max:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail="rating_min is greater than rating_max",
+        )
+    genres = [name for name in filter or () if name]
+    catalogue = genre_catalogue.catalogue
+    if catalogue:
+        found = [catalogue.find(name) for name in genres]
+        if not all(found):
+            raise HTTPException(
+                status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="unknown genre"
+            )
+        genres = [genre.name for genre in found]
+    return FilmFilter(
+        genres=genres,
+        rating_min=rating_min,
+        rating_max=rating_max,
+        types=[value for value in type or () if value],
+    )
+
+
+@router.get("/search", response_model=FilmPage, description="Поиск по фильмам")
 async def films_search(
     query: str,
+    page: PageParams = Depends(),
+    fields: tuple[str, ...] = Depends(sparse_fields),
     film_service: FilmService = Depends(get_film_service),
-):
+) -> Response:
     """
     Поиск по фильмам
     """
-    films = await film_service.search(query)
+    try:
+        body = await film_service.search(
+            query,
+            page.page_number,
+            page.page_size,
+            page.page_token,
+            fields=fields,
+            raw=True,
+        )
+    except PageError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    # Тело уже сериализовано при записи в кеш, повторно модели не проверяются.
+    return Response(content=body, media_type="application/json")
+
 
-    return paginate(films)
+@router.get(
+    "/suggest",
+    response_model=list[FilmSuggestion],
+    description="Подсказки фильмов по началу слов названия",
+)
+async def films_suggest(
+    query: str = Query(..., min_length=1, max_length=100),
+    size: int = Query(settings.SUGGEST_SIZE, ge=1, le=settings.SUGGEST_MAX_SIZE),
+    suggest_service: SuggestService = Depends(get_film_suggest_service),
+) -> Response:
+    body = await suggest_service.suggest(query, size, raw=True)
+    return Response(content=body, media_type="application/json")
+
+
+@router.post(
+    "/_mget",
+    response_model=list[Optional[Film]],
+    description="Фильмы по списку id, null для несуществующих",
+)
+async def films_mget(
+    request: IdList, film_service: FilmService = Depends(get_film_service)
+) -> Response:
+    body = await film_service.get_many(request.ids, raw=True)
+    return Response(content=body, media_type="application/json")
+
+
+@router.get(
+    "/facets",
+    response_model=FilmFacets,
+    description="Число фильмов по жанрам и типам для фильтра списка",
+)
+async def films_facets(
+    filter: FilmFilter = Depends(film_filter),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
+    body = await film_service.get_facets(filter, raw=True)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get("/{film_id}", response_model=Film, description="Вывод информации о фильме")
 async def film_details(
     film_id: str, film_service: FilmService = Depends(get_film_service)
-) -> Film:
-    film = await film_service.get_by_id(film_id)
-    if not film:
+) -> Response:
+    body = await film_service.get_by_id(film_id, raw=True)
+    if not body:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
 
-    return film
-
-
-class EnumStrMixin(enum.Enum):
-    def __str__(self) -> str:
-        return self.value
-
-
-class SortTypes(EnumStrMixin):
-    rating = "rating"
-
-
-class FilterGenres(EnumStrMixin):
-    animation = "Animation"
-    action = "Action"
-    adventure = "Adventure"
-    fantasy = "Fantasy"
-    sci_fi = "Sci-Fi"
-    drama = "Drama"
-    music = "Music"
-    romance = "Romance"
-    thriller = "Thriller"
-    mystery = "Mystery"
-    comedy = "Comedy"
-    family = "Family"
-    biography = "Biography"
-    musical = "Musical"
-    crime = "Crime"
-    short = "Short"
-    western = "Western"
-    documentary = "Documentary"
-    history = "History"
-    war = "War"
-    game_show = "Game-Show"
-    reality_tv = "Reality-TV"
-    horror = "Horror"
-    sport = "Sport"
-    talk_show = "Talk-Show"
-    news = "News"
-
-
-@router.get("/", response_model=Page[FilmForPerson], description="Вывод всех фильмов")
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/", response_model=FilmPage, description="Вывод всех фильмов")
 async def get_all_films(
     sort: Optional[SortTypes] = None,
-    filter: Optional[FilterGenres] = None,
+    filter: FilmFilter = Depends(film_filter),
+    page: PageParams = Depends(),
+    fields: tuple[str, ...] = Depends(sparse_fields),
     film_service: FilmService = Depends(get_film_service),
-) -> Page[list[Film]]:
-
-    if not sort:
-        sort = ""
-
-    if not filter:
-        filter = ""
-
-    films = await film_service.get_all_films(sort, filter)
-
-    return paginate(films)
-
-
-add_pagination(router)
+) -> Response:
+
+    sort = str(sort) if sort else ""
+
+    try:
+        body = await film_service.get_all_films(
+            sort,
+            filter,
+            page.page_number,
+            page.page_size,
+            page.page_token,
+            fields=fields,
+            raw=True,
+        )
+    except PageError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    return Response(content=body, media_type="application/json")
@@ -1,29 +1,42 @@
 from http import HTTPStatus
+from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
-from models.data_models import Genre
+from models.data_models import Genre, IdList
 from services.genres import GenreService, get_genre_service
 
 router = APIRouter()
 
 
+@router.post(
+    "/_mget",
+    response_model=list[Optional[Genre]],
+    description="Жанры по списку id, null для несуществующих",
+)
+async def genres_mget(
+    request: IdList, genre_service: GenreService = Depends(get_genre_service)
+) -> Response:
+    body = await genre_service.get_many(request.ids, raw=True)
+    return Response(content=body, media_type="application/json")
+
+
 @router.get("/{genre_id}", response_model=Genre, description="Вывод информации о жанре")
 async def genre_details(
     genre_id: str, genre_service: GenreService = Depends(get_genre_service)
-) -> Genre:
-    genre = await genre_service.get_by_id(genre_id)
-    if not genre:
+) -> Response:
+    body = await genre_service.get_by_id(genre_id, raw=True)
+    if not body:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
 
-    return Genre(id=genre.id, name=genre.name, description=genre.description)
+    return Response(content=body, media_type="application/json")
 
 
-@router.get("/", description="Вывод списка жанров")
+@router.get("/", response_model=list[Genre], description="Вывод списка жанров")
 async def genre_list(
-    page_size: int,
-    page_number: int,
+    page_size: int = Query(..., ge=1, le=100),
+    page_number: int = Query(1, ge=1),
     genre_service: GenreService = Depends(get_genre_service),
-):
-    genres = await genre_service.get_list(page_number, page_size)
-    return genres
+) -> Response:
+    body = await genre_service.get_list(page_number, page_size, raw=True)
+    return Response(content=body, media_type="application/json")
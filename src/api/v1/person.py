@@ -1,13 +1,47 @@
 from http import HTTPStatus
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException
-from models.data_models import PersonShort, FilmId
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from core.config import settings
+from models.data_models import IdList, PersonShort, PersonSuggestion, FilmId
 from services.persons import PersonService, get_person_service
+from services.suggest import SuggestService, get_person_suggest_service
 
 router = APIRouter()
 
 
+@router.post(
+    "/_mget",
+    response_model=List[Optional[PersonShort]],
+    description='Персоны по списку id, null для несуществующих'
+)
+async def persons_mget(
+    request: IdList, person_service: PersonService = Depends(get_person_service)
+) -> List[Optional[PersonShort]]:
+    persons = await person_service.get_many(request.ids)
+    return [
+        PersonShort(id=p.id, name=p.name, films_ids=[FilmId(id=f.id) for f in p.films])
+        if p
+        else None
+        for p in persons
+    ]
+
+
+@router.get(
+    "/suggest/",
+    response_model=List[PersonSuggestion],
+    description='Подсказки персон по началу слов имени'
+)
+async def person_suggest(
+    query: str = Query(..., min_length=1, max_length=100),
+    size: int = Query(settings.SUGGEST_SIZE, ge=1, le=settings.SUGGEST_MAX_SIZE),
+    suggest_service: SuggestService = Depends(get_person_suggest_service),
+) -> Response:
+    body = await suggest_service.suggest(query, size, raw=True)
+    return Response(content=body, media_type="application/json")
+
+
 @router.get(
     "/{person_id}",
     response_model=PersonShort,
@@ -15,36 +49,31 @@ router = APIRouter()
 )
 async def person_details(
     person_id: str, person_service: PersonService = Depends(get_person_service)
-) -> PersonShort:
-    person = await person_service.get_by_id(person_id)
-    if not person:
+) -> Response:
+    body = await person_service.get_short_by_id(person_id, raw=True)
+    if not body:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
 
-    return PersonShort(
-        id=person.id,
-        name=person.name,
-        films_ids=[FilmId(id=f.id) for f in person.films],
-    )
+    return Response(content=body, media_type="application/json")
 
 
 @router.get(
     "/",
+    response_model=List[PersonShort],
     description='Вывод всех персон'
 )
 async def person_list(
     page_size: int,
     page_number: int,
     person_service: PersonService = Depends(get_person_service),
-) -> Optional[List[PersonShort]]:
-    persons = await person_service.get_list(page_number, page_size)
-    return [
-        PersonShort(id=p.id, name=p.name, films_ids=[FilmId(id=f.id) for f in p.films])
-        for p in persons
-    ]
+) -> Response:
+    body = await person_service.get_list(page_number, page_size, raw=True)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get(
     "/search/",
+    response_model=List[PersonShort],
     description='Поиск по персонам'
 )
 async def person_search(
@@ -52,12 +81,9 @@ async def person_search(
     page_size: int,
     page_number: int,
     person_service: PersonService = Depends(get_person_service),
-) -> Optional[List[PersonShort]]:
-    persons = await person_service.search(page_number, page_size, query)
-    return [
-        PersonShort(id=p.id, name=p.name, films_ids=[FilmId(id=f.id) for f in p.films])
-        for p in persons
-    ]
+) -> Response:
+    body = await person_service.search(page_number, page_size, query, raw=True)
+    return Response(content=body, media_type="application/json")
 
 
 @router.get(
@@ -12,6 +12,53 @@ class Settings(BaseSettings):
     REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
     ELASTIC_HOST = os.getenv("ELASTIC_HOST", "127.0.0.1")
     ELASTIC_PORT = int(os.getenv("ELASTIC_PORT", 9200))
+    # Кеш сбрасывается ETL после загрузки данных, поэтому TTL может быть длинным.
+    CACHE_EXPIRE_IN_SECONDS = int(os.getenv("CACHE_EXPIRE_IN_SECONDS", 60 * 60 * 24))
+    # Мягкий TTL: старше него значение отдается из кеша, но обновляется в фоне
+    # (stale-while-revalidate). 0 - значения свежие до самого истечения ключа.
+    CACHE_SOFT_EXPIRE_IN_SECONDS = int(os.getenv("CACHE_SOFT_EXPIRE_IN_SECONDS", 300))
+    # Списки, поиск и фасеты кешируются под поколением индекса и после каждой
+    # загрузки ETL становятся недостижимы, поэтому живут лишь несколько мягких TTL.
+    CACHE_LIST_EXPIRE_IN_SECONDS = int(
+        os.getenv(
+            "CACHE_LIST_EXPIRE_IN_SECONDS", 3 * CACHE_SOFT_EXPIRE_IN_SECONDS or 900
+        )
+    )
+    # Значения в redis больше этого размера сжимаются zlib (0 - не сжимать).
+    CACHE_COMPRESS_MIN_BYTES = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", 4096))
+    CACHE_COMPRESS_LEVEL = int(os.getenv("CACHE_COMPRESS_LEVEL", 1))
+    # Локальный кеш процесса: число записей и время жизни по типам сущностей.
+    FILM_LOCAL_CACHE_SIZE = int(os.getenv("FILM_LOCAL_CACHE_SIZE", 1000))
+    FILM_LOCAL_CACHE_TTL = float(os.getenv("FILM_LOCAL_CACHE_TTL", 60))
+    PERSON_LOCAL_CACHE_SIZE = int(os.getenv("PERSON_LOCAL_CACHE_SIZE", 1000))
+    PERSON_LOCAL_CACHE_TTL = float(os.getenv("PERSON_LOCAL_CACHE_TTL", 60))
+    GENRE_LOCAL_CACHE_SIZE = int(os.getenv("GENRE_LOCAL_CACHE_SIZE", 100))
+    GENRE_LOCAL_CACHE_TTL = float(os.getenv("GENRE_LOCAL_CACHE_TTL", 300))
+    # Блокировка в redis на время загрузки промаха, чтобы воркеры не грузили
+    # один ключ одновременно (0 - только объединение запросов внутри процесса).
+    CACHE_LOCK_TIMEOUT_MS = int(os.getenv("CACHE_LOCK_TIMEOUT_MS", 0))
+    DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 50))
+    # Прогрев кеша списков фильмов и жанров при старте и после загрузок ETL.
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1").lower() in ("1", "true", "yes")
+    WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", 8))
+    WARMUP_TOP_FILMS = int(os.getenv("WARMUP_TOP_FILMS", 100))
+    # Прогрев после событий ETL ждет паузы в событиях, но не дольше MAX_DELAY.
+    WARMUP_DEBOUNCE = float(os.getenv("WARMUP_DEBOUNCE", 5))
+    WARMUP_MAX_DELAY = float(os.getenv("WARMUP_MAX_DELAY", 60))
+    # Каталог жанров в памяти перечитывается по событиям ETL и не реже этого.
+    GENRE_CATALOGUE_REFRESH = float(os.getenv("GENRE_CATALOGUE_REFRESH", 60))
+    # Подсказки при наборе: размер ответа, его предел и короткий TTL кеша.
+    SUGGEST_SIZE = int(os.getenv("SUGGEST_SIZE", 10))
+    SUGGEST_MAX_SIZE = int(os.getenv("SUGGEST_MAX_SIZE", 20))
+    SUGGEST_CACHE_EXPIRE_IN_SECONDS = int(
+        os.getenv("SUGGEST_CACHE_EXPIRE_IN_SECONDS", 60)
+    )
+    SUGGEST_LOCAL_CACHE_SIZE = int(os.getenv("SUGGEST_LOCAL_CACHE_SIZE", 1000))
+    SUGGEST_LOCAL_CACHE_TTL = float(os.getenv("SUGGEST_LOCAL_CACHE_TTL", 10))
+    # Дальше этой глубины from/size не работает, нужен page_token (search_after).
+    MAX_RESULT_WINDOW = int(os.getenv("MAX_RESULT_WINDOW", 10000))
+    # Сколько совпадений считать точно, дальше total - нижняя граница.
+    TRACK_TOTAL_HITS = int(os.getenv("TRACK_TOTAL_HITS", 10000))
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
     class Config:
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import aioredis
 import uvicorn
@@ -5,9 +6,13 @@ from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 
-from api.v1 import films, person, genre
+from api.v1 import cache_stats, films, person, genre
 from core.config import settings
 from db import elastic, redis
+from services import cache
+from services.films import FilmService
+from services.genre_catalogue import CatalogueUpdater
+from services.warmup import Warmer
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -25,11 +30,29 @@ async def startup():
     elastic.es = AsyncElasticsearch(
         hosts=[f"{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}"]
     )
+    catalogue_updater = CatalogueUpdater(elastic.es)
+    await catalogue_updater.reload()
+    app.state.catalogue_updater = asyncio.create_task(catalogue_updater.run())
+    listeners = [catalogue_updater.schedule]
+    if settings.WARMUP_ENABLED:
+        warmer = Warmer(redis.redis, FilmService(redis.redis, elastic.es))
+        listeners.append(warmer.schedule)
+        app.state.warmup = asyncio.create_task(warmer.warm_up())
+
+    def on_event(index: str) -> None:
+        for listener in listeners:
+            listener(index)
+
+    app.state.invalidation_listener = asyncio.create_task(
+        cache.listen_invalidations(on_event)
+    )
     logging.info('Service up')
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    app.state.invalidation_listener.cancel()
+    app.state.catalogue_updater.cancel()
     redis.redis.close()
     await redis.redis.wait_closed()
     await elastic.es.close()
@@ -38,6 +61,7 @@ async def shutdown():
 app.include_router(films.router, prefix="/api/v1/films", tags=["films"])
 app.include_router(person.router, prefix="/api/v1/person", tags=["person"])
 app.include_router(genre.router, prefix="/api/v1/genre", tags=["genre"])
+app.include_router(cache_stats.router, prefix="/api/v1/cache", tags=["cache"])
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -1,7 +1,12 @@
 from typing import List, Optional
 
+from pydantic import conlist
+
 from .base import Base
 
+# Сколько документов можно запросить одним _mget.
+MGET_MAX_IDS = 100
+
 
 class GenreForFilm(Base):
     id: str
@@ -20,6 +25,67 @@ class FilmForPerson(Base):
     type: str
 
 
+class FilmSuggestion(Base):
+    id: str
+    title: str
+
+
+class PersonSuggestion(Base):
+    id: str
+    name: str
+
+
+class FilmPage(Base):
+    items: List[FilmForPerson]
+    # При total_relation == 'gte' total - нижняя граница, а не точное число.
+    total: int
+    total_relation: str = 'eq'
+    # Номер страницы неизвестен, если она получена по page_token.
+    page: Optional[int]
+    size: int
+    next_page_token: Optional[str]
+
+
+class FilmFilter(Base):
+    # Жанры и типы внутри фильтра объединяются через ИЛИ, разные фильтры - через И.
+    genres: List[str] = []
+    rating_min: Optional[float]
+    rating_max: Optional[float]
+    types: List[str] = []
+
+    def cache_value(self) -> str:
+        """Фильтр в ключе кеша: одинаковые наборы дают одну строку."""
+        return ';'.join(
+            [
+                ','.join(sorted(set(self.genres))),
+                '' if self.rating_min is None else str(self.rating_min),
+                '' if self.rating_max is None else str(self.rating_max),
+                ','.join(sorted(set(self.types))),
+            ]
+        )
+
+
+class FacetCount(Base):
+    value: str
+    count: int
+
+
+class GenreFacetCount(Base):
+    id: str
+    # Имя известно, если жанр есть в каталоге.
+    name: Optional[str]
+    count: int
+
+
+class FilmFacets(Base):
+    # Фильмы, подходящие под все фильтры.
+    total: int
+    # Счетчики жанров учитывают все фильтры, кроме жанрового, счетчики
+    # типов - все, кроме фильтра по типу, как в мультивыборе.
+    genres: List[GenreFacetCount]
+    types: List[FacetCount]
+
+
 class Film(Base):
     id: str
     title: str
@@ -52,3 +118,7 @@ class PersonShort(Base):
     id: str
     name: str
     films_ids: Optional[List[FilmId]]
+
+
+class IdList(Base):
+    ids: conlist(str, min_items=1, max_items=MGET_MAX_IDS)
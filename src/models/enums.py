@@ -0,0 +1,10 @@
+import enum
+
+
+class EnumStrMixin(enum.Enum):
+    def __str__(self) -> str:
+        return self.value
+
+
+class SortTypes(EnumStrMixin):
+    rating = "rating"
@@ -0,0 +1,64 @@
+from functools import lru_cache
+from typing import List, Optional, Type
+
+from pydantic import BaseModel, create_model
+
+
+class FieldsError(ValueError):
+    """В fields запрошены поля, которых нет в модели ответа."""
+
+
+def source_includes(model: Type[BaseModel]) -> list[str]:
+    """Пути _source в elasticsearch, из которых собирается модель."""
+    paths = []
+    for name, field in model.__fields__.items():
+        if isinstance(field.type_, type) and issubclass(field.type_, BaseModel):
+            paths.extend(f'{name}.{path}' for path in source_includes(field.type_))
+        else:
+            paths.append(name)
+    return paths
+
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str]) -> tuple[str, ...]:
+    """
+    Поля из параметра fields=a,b в порядке полей модели, чтобы одинаковые
+    наборы давали один ключ кеша. Пустой кортеж - все поля.
+    """
+    if not fields:
+        return ()
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = requested - model.__fields__.keys()
+    if unknown:
+        raise FieldsError(f'unknown fields: {", ".join(sorted(unknown))}')
+    return tuple(name for name in model.__fields__ if name in requested)
+
+
+@lru_cache()
+def sparse_model(model: Type[BaseModel], fields: tuple[str, ...]) -> Type[BaseModel]:
+    """Модель только с полями fields. Без fields - сама модель."""
+    if not fields:
+        return model
+    definitions = {}
+    for name in fields:
+        field = model.__fields__[name]
+        type_ = Optional[field.outer_type_] if field.allow_none else field.outer_type_
+        definitions[name] = (type_, ... if field.required else field.default)
+    return create_model(
+        f'{model.__name__}[{",".join(fields)}]',
+        __base__=model.__base__,
+        **definitions,
+    )
+
+
+@lru_cache()
+def page_model(
+    model: Type[BaseModel], item_model: Type[BaseModel]
+) -> Type[BaseModel]:
+    """Модель страницы model, в которой items - список item_model."""
+    if model.__fields__['items'].type_ is item_model:
+        return model
+    return create_model(
+        f'{model.__name__}[{item_model.__name__}]',
+        __base__=model,
+        items=(List[item_model], ...),
+    )
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Awaitable, Callable, Optional, Type
+
+import aioredis
+import orjson
+from pydantic import BaseModel
+
+from core.config import settings
+from services import codec
+
+# Канал и формат ключей документов совпадают с ETL/invalidation.py.
+INVALIDATION_CHANNEL = 'cache_invalidation'
+CACHE_ID_KEYS = {
+    'movies': ('film_id',),
+    'persons': ('person_id', 'person_short_id'),
+    'genres': ('genre_id',),
+}
+RECONNECT_DELAY = 5
+
+
+class CacheEntry:
+    """
+    Значение кеша: готовое JSON-тело ответа и время, до которого оно свежее.
+    Модели собираются из тела только если они нужны вызывающему коду.
+    """
+
+    __slots__ = ('body', 'fresh_until', '_model', '_many', '_value')
+
+    def __init__(
+        self,
+        body: bytes,
+        fresh_until: float,
+        model: Type[BaseModel],
+        many: bool = False,
+        value: Any = None,
+    ):
+        self.body = body
+        self.fresh_until = fresh_until
+        self._model = model
+        self._many = many
+        self._value = value
+
+    @property
+    def value(self) -> Any:
+        if self._value is None:
+            self._value = codec.from_json(self._model, self.body, self._many)
+        return self._value
+
+
+class LocalCache:
+    """
+    Кеш в памяти процесса перед redis: ограничен по числу записей (LRU)
+    и по времени жизни записи. Хранит CacheEntry с уже собранными моделями,
+    поэтому попадание не требует ни сетевого запроса, ни разбора JSON.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None or item[0] < monotonic():
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class SingleFlight:
+    """
+    Объединение одновременных промахов по одному ключу: первый запрос
+    запускает загрузку отдельной задачей, остальные ждут ее результат.
+    Отмена одного из ожидающих запросов не прерывает общую загрузку.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.deduplicated = 0
+        # Промахи, дождавшиеся загрузки другим воркером под блокировкой в redis.
+        self.lock_deduplicated = 0
+        # Фоновые обновления устаревших значений.
+        self.refreshes = 0
+        self._tasks: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._start(key, load)
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    def refresh(self, key: str, load: Callable[[], Awaitable[Any]]) -> None:
+        """Фоновое обновление ключа, если он уже не загружается."""
+        if key in self._tasks:
+            return
+        self.refreshes += 1
+        self._start(key, load).add_done_callback(_log_refresh_error)
+
+    def _start(self, key: str, load: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        task = asyncio.ensure_future(load())
+        self._tasks[key] = task
+        task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        self.calls += 1
+        return task
+
+    def stats(self) -> dict:
+        return {
+            'calls': self.calls,
+            'deduplicated': self.deduplicated,
+            'lock_deduplicated': self.lock_deduplicated,
+            'refreshes': self.refreshes,
+            'in_flight': len(self._tasks),
+        }
+
+
+def _log_refresh_error(task: asyncio.Future) -> None:
+    if not task.cancelled() and task.exception():
+        logging.error('Background cache refresh failed.', exc_info=task.exception())
+
+
+single_flight = SingleFlight()
+local_caches = {
+    'movies': LocalCache(settings.FILM_LOCAL_CACHE_SIZE, settings.FILM_LOCAL_CACHE_TTL),
+    'persons': LocalCache(
+        settings.PERSON_LOCAL_CACHE_SIZE, settings.PERSON_LOCAL_CACHE_TTL
+    ),
+    'genres': LocalCache(
+        settings.GENRE_LOCAL_CACHE_SIZE, settings.GENRE_LOCAL_CACHE_TTL
+    ),
+    # Подсказки всех индексов: короткий TTL вместо сброса по событиям.
+    'suggest': LocalCache(
+        settings.SUGGEST_LOCAL_CACHE_SIZE, settings.SUGGEST_LOCAL_CACHE_TTL
+    ),
+}
+# Поколения индексов, известные процессу. Пока подписка на канал работает,
+# они обновляются по событиям и ключи списков строятся без запроса в redis.
+generations: dict[str, str] = {}
+subscribed = False
+# Счетчик событий: поколение, прочитанное до события, сохранять нельзя.
+events = 0
+
+
+def get_generation(index: str) -> Optional[str]:
+    return generations.get(index) if subscribed else None
+
+
+def set_generation(index: str, generation: str, seen_events: int) -> None:
+    if subscribed and seen_events == events:
+        generations[index] = generation
+
+
+def invalidate(index: str, ids: Optional[list[str]]) -> None:
+    global events
+    events += 1
+    cache = local_caches.get(index)
+    if cache is None:
+        return
+    generations.pop(index, None)
+    if ids is None:
+        cache.clear()
+        return
+    for name in CACHE_ID_KEYS[index]:
+        for doc_id in ids:
+            cache.delete(f'{index}:{name}:{doc_id}')
+
+
+def clear_all() -> None:
+    global events
+    events += 1
+    generations.clear()
+    for cache in local_caches.values():
+        cache.clear()
+
+
+async def listen_invalidations(
+    on_event: Optional[Callable[[str], None]] = None
+) -> None:
+    """
+    Подписка на события сброса кеша от ETL. Пока соединения нет, события
+    могут потеряться, поэтому после каждого (пере)подключения локальный
+    кеш очищается целиком. on_event вызывается с индексом каждого события.
+    """
+    global subscribed
+    while True:
+        try:
+            conn = await aioredis.create_redis(
+                (settings.REDIS_HOST, settings.REDIS_PORT)
+            )
+            try:
+                channel, = await conn.subscribe(INVALIDATION_CHANNEL)
+                clear_all()
+                subscribed = True
+                async for message in channel.iter():
+                    event = orjson.loads(message)
+                    invalidate(event['index'], event['ids'])
+                    if on_event:
+                        on_event(event['index'])
+            finally:
+                subscribed = False
+                conn.close()
+                await conn.wait_closed()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logging.exception('Cache invalidation subscription failed.')
+        clear_all()
+        await asyncio.sleep(RECONNECT_DELAY)
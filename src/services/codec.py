@@ -0,0 +1,73 @@
+import zlib
+from typing import Any, Type, Union
+
+import orjson
+from pydantic import BaseModel
+from pydantic.fields import SHAPE_SINGLETON
+
+from core.config import settings
+
+# Первый байт значения в кеше: формат тела.
+RAW = b'j'
+ZLIB = b'z'
+
+
+def to_json(value: Union[BaseModel, list[BaseModel]]) -> bytes:
+    """JSON модели или списка моделей - то же тело, что отдает API."""
+    if isinstance(value, list):
+        return orjson.dumps([item.dict() for item in value])
+    return orjson.dumps(value.dict())
+
+
+def encode(body: bytes) -> bytes:
+    """
+    JSON в формат кеша. Большие значения сжимаются zlib,
+    если это действительно уменьшает их размер.
+    """
+    min_bytes = settings.CACHE_COMPRESS_MIN_BYTES
+    if min_bytes and len(body) >= min_bytes:
+        compressed = zlib.compress(body, settings.CACHE_COMPRESS_LEVEL)
+        if len(compressed) < len(body):
+            return ZLIB + compressed
+    return RAW + body
+
+
+def decode(data: bytes) -> bytes:
+    """JSON из формата кеша без разбора."""
+    fmt, body = data[:1], data[1:]
+    if fmt == ZLIB:
+        return zlib.decompress(body)
+    if fmt != RAW:
+        raise ValueError('unknown cache format')
+    return body
+
+
+def from_json(model: Type[BaseModel], body: bytes, many: bool = False) -> Any:
+    """
+    Модели из кеша без валидации: данные записаны самим API из уже
+    проверенных моделей, поэтому достаточно construct.
+    """
+    obj = orjson.loads(body)
+    if many:
+        return [construct(model, item) for item in obj]
+    return construct(model, obj)
+
+
+def construct(model: Type[BaseModel], data: dict) -> BaseModel:
+    """BaseModel.construct, который собирает и вложенные модели."""
+    values = {}
+    for name, field in model.__fields__.items():
+        if name not in data:
+            continue
+        value = data[name]
+        if (
+            value is not None
+            and isinstance(field.type_, type)
+            and issubclass(field.type_, BaseModel)
+        ):
+            if field.shape == SHAPE_SINGLETON:
+                value = construct(field.type_, value)
+            else:
+                value = [construct(field.type_, item) for item in value]
+        values[name] = value
+    return model.construct(**values)
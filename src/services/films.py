@@ -5,18 +5,35 @@ from aioredis import Redis
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 
+from core.config import settings
 from db.elastic import get_elastic
 from db.redis import get_redis
-from models.data_models import Film, FilmForPerson
-from services.tools import CacheValue, ServiceMixin
-
-from pydantic import BaseModel
-
-FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
-
-
-class ListCache(BaseModel):
-    __root__: list[str]
+from models.data_models import (
+    FacetCount,
+    Film,
+    FilmFacets,
+    FilmFilter,
+    FilmForPerson,
+    FilmPage,
+    GenreFacetCount,
+)
+from models.projection import page_model, source_includes, sparse_model
+from services import genre_catalogue
+from services.tools import (
+    CacheValue,
+    PageError,
+    ServiceMixin,
+    decode_page_token,
+    encode_page_token,
+)
+
+FILM_CACHE_EXPIRE_IN_SECONDS = settings.CACHE_EXPIRE_IN_SECONDS
+FILM_LIST_CACHE_EXPIRE_IN_SECONDS = settings.CACHE_LIST_EXPIRE_IN_SECONDS
+# Из ответа на поиск нужны только документы, их sort и total.
+SEARCH_FILTER_PATH = 'hits.total,hits.hits._source,hits.hits.sort'
+FACETS_FILTER_PATH = 'aggregations'
+# Типов фильмов единицы, жанров не больше, чем помещается в каталог.
+MAX_FACET_TYPES = 20
 
 
 class FilmService(ServiceMixin):
@@ -25,52 +42,125 @@ class FilmService(ServiceMixin):
         self.elastic = elastic
         self._index_name = 'movies'
 
-    async def get_by_id(self, film_id: str) -> Optional[Film]:
+    async def get_by_id(self, film_id: str, raw: bool = False) -> Optional[Film]:
 
         cache_key = self._build_cache_key([CacheValue(name='film_id', value=film_id)])
 
-        film = await self._film_from_cache(cache_key)
-        if not film:
-            film = await self._get_film_from_elastic(film_id)
-            if not film:
-                return None
-            await self._put_film_to_cache(cache_key, film)
+        return await self._cached(
+            cache_key,
+            lambda: self._get_film_from_elastic(film_id),
+            Film,
+            FILM_CACHE_EXPIRE_IN_SECONDS,
+            raw=raw,
+        )
 
-        return film
+    async def get_many(self, film_ids: list[str], raw: bool = False) -> list:
+        return await self._mget_cached(
+            film_ids, 'film_id', Film, FILM_CACHE_EXPIRE_IN_SECONDS, raw=raw
+        )
 
     async def get_all_films(
         self,
         sort: Optional[str],
-        filter: Optional[str],
-    ) -> list[FilmForPerson]:
+        filter: FilmFilter,
+        page_number: int,
+        page_size: int,
+        page_token: Optional[str] = None,
+        fields: tuple[str, ...] = (),
+        raw: bool = False,
+    ) -> FilmPage:
 
-        body = {"query": {"bool": {"must": {"match_all": {}}}}}
+        body = {"query": self._bool_filter(self._filter_clauses(filter).values())}
 
         if sort:
-            body["sort"] = [{f"{sort}": "desc"}, "_score"]
-
-        if filter:
-            body["query"]["bool"]["filter"] = {"match": {"genres.name": f"{filter}"}}
+            # Фильмы без рейтинга в конце, id - уникальный ключ для search_after.
+            body["sort"] = [
+                {f"{sort}": {"order": "desc", "missing": -1}},
+                {"id": "asc"},
+            ]
+        else:
+            body["sort"] = [{"id": "asc"}]
 
         cache_key = self._build_cache_key(
             [
+                await self._generation_value(),
                 CacheValue(name='sort', value=sort),
-                CacheValue(name='filter', value=filter),
+                CacheValue(name='filter', value=filter.cache_value()),
+                *self._page_values(page_number, page_size, page_token, fields),
             ]
         )
+        model = page_model(FilmPage, sparse_model(FilmForPerson, fields))
+
+        return await self._cached(
+            cache_key,
+            lambda: self._search_films(body, page_number, page_size, page_token, model),
+            model,
+            FILM_LIST_CACHE_EXPIRE_IN_SECONDS,
+            raw=raw,
+        )
 
-        if not cache_key:
-            cache_key = "all_films"
-
-        films: Optional[list[FilmForPerson]] = await self._films_from_cache(cache_key)
-
-        if not films:
-            films = await self._search_films(body)
-            await self._put_films_to_cache(cache_key, films)
-
-        return films
+    async def get_facets(self, filter: FilmFilter, raw: bool = False) -> FilmFacets:
+        """
+        Счетчики по жанрам и типам для фильтра одним запросом без документов.
+        Кешируются отдельно от страниц: они не зависят от сортировки и номера
+        страницы.
+        """
+        clauses = self._filter_clauses(filter)
+        genres = clauses.pop('genres', None)
+        types = clauses.pop('types', None)
+        body = {
+            "size": 0,
+            "track_total_hits": False,
+            "query": self._bool_filter(clauses.values()),
+            "aggs": {
+                "filtered": {"filter": self._bool_filter([genres, types])},
+                "genres": {
+                    "filter": self._bool_filter([types]),
+                    "aggs": {
+                        "nested": {
+                            "nested": {"path": "genres"},
+                            "aggs": {
+                                "ids": {
+                                    "terms": {
+                                        "field": "genres.id",
+                                        "size": genre_catalogue.MAX_GENRES,
+                                    }
+                                }
+                            },
+                        }
+                    },
+                },
+                "types": {
+                    "filter": self._bool_filter([genres]),
+                    "aggs": {
+                        "values": {"terms": {"field": "type", "size": MAX_FACET_TYPES}}
+                    },
+                },
+            },
+        }
+        cache_key = self._build_cache_key(
+            [
+                await self._generation_value(),
+                CacheValue(name='facets', value=filter.cache_value()),
+            ]
+        )
+        return await self._cached(
+            cache_key,
+            lambda: self._get_facets_from_elastic(body),
+            FilmFacets,
+            FILM_LIST_CACHE_EXPIRE_IN_SECONDS,
+            raw=raw,
+        )
 
-    async def search(self, query: str) -> list[FilmForPerson]:
+    async def search(
+        self,
+        query: str,
+        page_number: int,
+        page_size: int,
+        page_token: Optional[str] = None,
+        fields: tuple[str, ...] = (),
+        raw: bool = False,
+    ) -> FilmPage:
         body = {
             "query": {
                 "multi_match": {
@@ -84,29 +174,148 @@ class FilmService(ServiceMixin):
                         "genre",
                     ],
                 }
-            }
+            },
+            "sort": ["_score", {"id": "asc"}],
         }
 
-        cache_key = self._build_cache_key([CacheValue(name='query', value=query)])
-        films: list[FilmForPerson] = await self._films_from_cache(cache_key)
+        cache_key = self._build_cache_key(
+            [
+                await self._generation_value(),
+                CacheValue(name='query', value=query),
+                *self._page_values(page_number, page_size, page_token, fields),
+            ]
+        )
+        model = page_model(FilmPage, sparse_model(FilmForPerson, fields))
+        return await self._cached(
+            cache_key,
+            lambda: self._search_films(body, page_number, page_size, page_token, model),
+            model,
+            FILM_LIST_CACHE_EXPIRE_IN_SECONDS,
+            raw=raw,
+        )
+
+    @staticmethod
+    def _page_values(
+        page_number: int,
+        page_size: int,
+        page_token: Optional[str],
+        fields: tuple[str, ...] = (),
+    ) -> list[CacheValue]:
+        # Страница по токену не зависит от номера, ключ строится по самому токену.
+        values = [
+            CacheValue(name='after', value=page_token)
+            if page_token
+            else CacheValue(name='page', value=page_number),
+            CacheValue(name='size', value=page_size),
+        ]
+        if fields:
+            values.append(CacheValue(name='fields', value=','.join(fields)))
+        return values
 
-        if not films:
-            films = await self._search_films(body)
-            await self._put_films_to_cache(cache_key, films)
+    @staticmethod
+    def _filter_clauses(filter: FilmFilter) -> dict:
+        """
+        Условия фильтра для контекста filter: они не влияют на score
+        и кешируются elasticsearch. Жанры - nested-поле, поэтому фильтр
+        по ним - nested-запрос по id жанров из каталога.
+        """
+        clauses = {}
+        if filter.genres:
+            clauses['genres'] = {
+                "nested": {"path": "genres", "query": _genres_query(filter.genres)}
+            }
+        if filter.rating_min is not None or filter.rating_max is not None:
+            rating = {}
+            if filter.rating_min is not None:
+                rating["gte"] = filter.rating_min
+            if filter.rating_max is not None:
+                rating["lte"] = filter.rating_max
+            clauses['rating'] = {"range": {"rating": rating}}
+        if filter.types:
+            clauses['types'] = {"terms": {"type": sorted(set(filter.types))}}
+        return clauses
 
-        return films
+    @staticmethod
+    def _bool_filter(clauses) -> dict:
+        clauses = [clause for clause in clauses if clause]
+        if not clauses:
+            return {"match_all": {}}
+        return {"bool": {"filter": clauses}}
 
-    async def _search_films(self, body: dict) -> list[FilmForPerson]:
+    async def _get_facets_from_elastic(self, body: dict) -> FilmFacets:
+        response = await self.elastic.search(
+            index=self._index_name, body=body, filter_path=FACETS_FILTER_PATH
+        )
+        aggs = response["aggregations"]
+        catalogue = genre_catalogue.catalogue
+        genres = []
+        for bucket in aggs["genres"]["nested"]["ids"]["buckets"]:
+            genre = catalogue.by_id.get(bucket["key"]) if catalogue else None
+            genres.append(
+                GenreFacetCount(
+                    id=bucket["key"],
+                    name=genre.name if genre else None,
+                    count=bucket["doc_count"],
+                )
+            )
+        return FilmFacets(
+            total=aggs["filtered"]["doc_count"],
+            genres=genres,
+            types=[
+                FacetCount(value=bucket["key"], count=bucket["doc_count"])
+                for bucket in aggs["types"]["values"]["buckets"]
+            ],
+        )
+
+    async def _search_films(
+        self,
+        body: dict,
+        page_number: int,
+        page_size: int,
+        page_token: Optional[str],
+        model: type[FilmPage] = FilmPage,
+    ) -> FilmPage:
+        """
+        Неглубокие страницы запрашиваются через from/size, глубокие - по токену
+        search_after, поэтому стоимость запроса не растет с номером страницы.
+        Точное число совпадений считается только до TRACK_TOTAL_HITS.
+        Из _source читаются только поля элементов страницы.
+        """
+        item_model = model.__fields__["items"].type_
+        body = {
+            **body,
+            "_source": source_includes(item_model),
+            "size": page_size,
+            "track_total_hits": settings.TRACK_TOTAL_HITS,
+        }
+        if page_token:
+            body["search_after"] = decode_page_token(page_token)
+        elif page_number * page_size > settings.MAX_RESULT_WINDOW:
+            raise PageError(
+                f'pages deeper than {settings.MAX_RESULT_WINDOW} results '
+                'are available only by page_token'
+            )
+        else:
+            body["from"] = (page_number - 1) * page_size
 
         response = await self.elastic.search(
             index=self._index_name,
             body=body,
+            filter_path=SEARCH_FILTER_PATH,
+        )
+        # filter_path убирает hits.hits целиком, если совпадений нет.
+        hits = response["hits"].get("hits", [])
+        next_page_token = None
+        if len(hits) == page_size:
+            next_page_token = encode_page_token(hits[-1]["sort"])
+        return model(
+            items=[item_model(**d["_source"]) for d in hits],
+            total=response["hits"]["total"]["value"],
+            total_relation=response["hits"]["total"]["relation"],
+            page=None if page_token else page_number,
+            size=page_size,
+            next_page_token=next_page_token,
         )
-        return self._convert_to_model(response)
-
-    @staticmethod
-    def _convert_to_model(response: dict) -> list[FilmForPerson]:
-        return [FilmForPerson(**d["_source"]) for d in response["hits"]["hits"]]
 
     async def _get_film_from_elastic(self, film_id: str) -> Optional[Film]:
         try:
@@ -115,32 +324,27 @@ class FilmService(ServiceMixin):
             return None
         return Film(**doc["_source"])
 
-    async def _film_from_cache(self, film_id: str) -> Optional[Film]:
-        data = await self.redis.get(film_id)
-        if not data:
-            return None
-        film = Film.parse_raw(data)
-        return film
-
-    async def _films_from_cache(self, cache_key: str) -> Optional[list[FilmForPerson]]:
-        data: str = await self.redis.get(cache_key)
 
-        if not data:
-            return None
-
-        data_list: ListCache = ListCache.parse_raw(data)
-        films: list[FilmForPerson] = [
-            FilmForPerson.parse_raw(film_data) for film_data in data_list.__root__
-        ]
-        return films
-
-    async def _put_film_to_cache(self, cache_key: str, film: Film):
-        await self.redis.set(cache_key, film.json(), expire=FILM_CACHE_EXPIRE_IN_SECONDS)
-
-    async def _put_films_to_cache(self, cache_key: str, films: list[FilmForPerson]):
-        data = [f.json() for f in films]
-        data_row = ListCache.parse_obj(data).json()
-        await self.redis.set(cache_key, data_row, expire=FILM_CACHE_EXPIRE_IN_SECONDS)
+def _genres_query(names: list[str]) -> dict:
+    """
+    Точный terms по id жанров из каталога. Пока каталог не загружен
+    или пуст, жанры ищутся по имени.
+    """
+    names = sorted(set(names))
+    catalogue = genre_catalogue.catalogue
+    if catalogue:
+        genres = [catalogue.find(name) for name in names]
+        if all(genres):
+            return {"terms": {"genres.id": [genre.id for genre in genres]}}
+    return {
+        "bool": {
+            "should": [
+                {"match": {"genres.name": {"query": name, "operator": "and"}}}
+                for name in names
+            ],
+            "minimum_should_match": 1,
+        }
+    }
 
 
 @lru_cache()
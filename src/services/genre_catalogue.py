@@ -0,0 +1,103 @@
+import asyncio
+import logging
+from types import MappingProxyType
+from typing import Iterable, Optional
+
+from elasticsearch import AsyncElasticsearch
+
+from core.config import settings
+from models.data_models import Genre
+from services import codec
+
+GENRES_INDEX = 'genres'
+MAX_GENRES = 1000
+
+
+class GenreCatalogue:
+    """
+    Неизменяемый снимок всех жанров с индексами по id и по имени.
+    Тела ответов сериализуются один раз при сборке снимка, поэтому
+    эндпоинты жанров отвечают без обращений к redis и elasticsearch.
+    """
+
+    def __init__(self, genres: Iterable[Genre]):
+        self.genres = tuple(sorted(genres, key=lambda g: (g.name.lower(), g.id)))
+        self.by_id = MappingProxyType({g.id: g for g in self.genres})
+        self.by_name = MappingProxyType({g.name.lower(): g for g in self.genres})
+        self._bodies = MappingProxyType({g.id: codec.to_json(g) for g in self.genres})
+
+    def __len__(self) -> int:
+        return len(self.genres)
+
+    def find(self, name: str) -> Optional[Genre]:
+        """Жанр по имени без учета регистра."""
+        return self.by_name.get(name.lower())
+
+    def body(self, genre_id: str) -> Optional[bytes]:
+        return self._bodies.get(genre_id)
+
+    def bodies(self, genre_ids: list[str]) -> bytes:
+        """JSON-массив жанров в порядке id, null для несуществующих."""
+        return b'[' + b','.join(self._bodies.get(i, b'null') for i in genre_ids) + b']'
+
+    def page(self, page_number: int, page_size: int) -> list[Genre]:
+        start = (page_number - 1) * page_size
+        return list(self.genres[start:start + page_size])
+
+    def page_body(self, page_number: int, page_size: int) -> bytes:
+        genres = self.page(page_number, page_size)
+        return b'[' + b','.join(self._bodies[g.id] for g in genres) + b']'
+
+
+# Текущий снимок. None или пустой снимок (индекс жанров еще не заполнен) -
+# каталога нет, сервисы тогда работают через кеш и elasticsearch как раньше.
+catalogue: Optional[GenreCatalogue] = None
+
+
+async def load_catalogue(elastic: AsyncElasticsearch) -> GenreCatalogue:
+    """Читает все жанры и подменяет снимок одним присваиванием."""
+    global catalogue
+    doc = await elastic.search(
+        index=GENRES_INDEX, body={'query': {'match_all': {}}}, size=MAX_GENRES
+    )
+    hits = doc['hits']['hits']
+    if doc['hits']['total']['value'] > len(hits):
+        logging.warning('Genre catalogue is truncated to %d genres.', len(hits))
+    catalogue = GenreCatalogue(Genre(**hit['_source']) for hit in hits)
+    return catalogue
+
+
+class CatalogueUpdater:
+    """
+    Перечитывает каталог после событий ETL по индексу жанров и раз в
+    GENRE_CATALOGUE_REFRESH секунд на случай потерянных событий.
+    События, пришедшие во время загрузки, объединяются в одну перезагрузку.
+    """
+
+    def __init__(self, elastic: AsyncElasticsearch):
+        self.elastic = elastic
+        self._changed = asyncio.Event()
+
+    def schedule(self, index: str) -> None:
+        if index == GENRES_INDEX:
+            self._changed.set()
+
+    async def reload(self) -> None:
+        """Перезагрузка каталога: при ошибке остается прежний снимок."""
+        try:
+            snapshot = await load_catalogue(self.elastic)
+        except Exception:
+            logging.exception('Genre catalogue reload failed.')
+            return
+        logging.debug('Genre catalogue loaded: %d genres.', len(snapshot))
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait(), settings.GENRE_CATALOGUE_REFRESH
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._changed.clear()
+            await self.reload()
@@ -5,13 +5,15 @@ from aioredis import Redis
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 
+from core.config import settings
 from db.elastic import get_elastic
 from db.redis import get_redis
 from models.data_models import Genre
+from services import codec, genre_catalogue
 from services.tools import CacheValue, ServiceMixin
 
 
-GENRE_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+GENRE_CACHE_EXPIRE_IN_SECONDS = settings.CACHE_EXPIRE_IN_SECONDS
 
 
 class GenreService(ServiceMixin):
@@ -20,24 +22,43 @@ class GenreService(ServiceMixin):
         self.elastic = elastic
         self._index_name = 'genres'
 
-    async def get_by_id(self, genre_id: str) -> Optional[Genre]:
+    async def get_by_id(self, genre_id: str, raw: bool = False) -> Optional[Genre]:
+        catalogue = genre_catalogue.catalogue
+        if catalogue:
+            return catalogue.body(genre_id) if raw else catalogue.by_id.get(genre_id)
 
         cache_key = self._build_cache_key(
             [CacheValue(name='genre_id', value=genre_id)]
         )
-        genre = await self._genre_from_cache(cache_key)
-        if not genre:
-            genre = await self._get_genre_from_elastic(genre_id)
-            if not genre:
-                return None
-            await self._put_genre_to_cache(cache_key, genre)
-        return genre
+        return await self._cached(
+            cache_key,
+            lambda: self._get_genre_from_elastic(genre_id),
+            Genre,
+            GENRE_CACHE_EXPIRE_IN_SECONDS,
+            raw=raw,
+        )
+
+    async def get_many(self, genre_ids: list[str], raw: bool = False) -> list:
+        catalogue = genre_catalogue.catalogue
+        if catalogue:
+            if raw:
+                return catalogue.bodies(genre_ids)
+            return [catalogue.by_id.get(genre_id) for genre_id in genre_ids]
+        return await self._mget_cached(
+            genre_ids, 'genre_id', Genre, GENRE_CACHE_EXPIRE_IN_SECONDS, raw=raw
+        )
 
-    async def get_list(self, page_number: int, page_size: int):
+    async def get_list(self, page_number: int, page_size: int, raw: bool = False):
+        catalogue = genre_catalogue.catalogue
+        if catalogue:
+            if raw:
+                return catalogue.page_body(page_number, page_size)
+            return catalogue.page(page_number, page_size)
         doc = await self.elastic.search(
             index=self._index_name, from_=(page_number - 1) * page_size, size=page_size
         )
-        return [Genre(**d["_source"]) for d in doc["hits"]["hits"]]
+        genres = [Genre(**d["_source"]) for d in doc["hits"]["hits"]]
+        return codec.to_json(genres) if raw else genres
 
     async def _get_genre_from_elastic(self, genre_id: str) -> Optional[Genre]:
         try:
@@ -46,18 +67,6 @@ class GenreService(ServiceMixin):
             return None
         return Genre(**doc["_source"])
 
-    async def _genre_from_cache(self, genre_id: str) -> Optional[Genre]:
-        data = await self.redis.get(genre_id)
-        if not data:
-            return None
-        genre = Genre.parse_raw(data)
-        return genre
-
-    async def _put_genre_to_cache(self, cache_key: str, genre: Genre):
-        await self.redis.set(
-            cache_key, genre.json(), expire=GENRE_CACHE_EXPIRE_IN_SECONDS
-        )
-
 
 @lru_cache()
 def get_genre_service(
@@ -4,20 +4,19 @@ from typing import Optional, List
 from aioredis import Redis
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
-from pydantic import BaseModel
 
+from core.config import settings
 from db.elastic import get_elastic
 from db.redis import get_redis
-from models.data_models import Person
+from models.data_models import FilmId, Person, PersonShort
 from services.tools import CacheValue, ServiceMixin
 
 
-PERSON_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
-FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5
-
-
-class ListCache(BaseModel):
-    __root__: List[str]
+PERSON_CACHE_EXPIRE_IN_SECONDS = settings.CACHE_EXPIRE_IN_SECONDS
+PERSON_LIST_CACHE_EXPIRE_IN_SECONDS = settings.CACHE_LIST_EXPIRE_IN_SECONDS
+# Списки отдают PersonShort: из фильмографии нужны только id фильмов.
+PERSON_SHORT_SOURCE = ['id', 'name', 'films.id']
+PERSON_LIST_FILTER_PATH = 'hits.hits._source'
 
 
 class PersonService(ServiceMixin):
@@ -30,25 +29,58 @@ class PersonService(ServiceMixin):
         cache_key = self._build_cache_key(
             [CacheValue(name='person_id', value=person_id)]
         )
-        person = await self._person_from_cache(cache_key)
-        if not person:
-            person = await self._get_person_from_elastic(person_id)
-            if not person:
-                return None
-            await self._put_person_to_cache(cache_key, person)
-        return person
+        return await self._cached(
+            cache_key,
+            lambda: self._get_person_from_elastic(person_id),
+            Person,
+            PERSON_CACHE_EXPIRE_IN_SECONDS,
+        )
+
+    async def get_short_by_id(
+        self, person_id: str, raw: bool = False
+    ) -> Optional[PersonShort]:
+        """Карточка персоны: в кеше лежит готовое тело PersonShort."""
+        cache_key = self._build_cache_key(
+            [CacheValue(name='person_short_id', value=person_id)]
+        )
+        return await self._cached(
+            cache_key,
+            lambda: self._get_person_short_from_elastic(person_id),
+            PersonShort,
+            PERSON_CACHE_EXPIRE_IN_SECONDS,
+            raw=raw,
+        )
+
+    async def get_many(self, person_ids: List[str]) -> List[Optional[Person]]:
+        return await self._mget_cached(
+            person_ids, 'person_id', Person, PERSON_CACHE_EXPIRE_IN_SECONDS
+        )
 
     async def get_list(
-        self, page_number: int, page_size: int
-    ) -> Optional[List[Person]]:
-        doc = await self.elastic.search(
-            index=self._index_name, from_=(page_number - 1) * page_size, size=page_size
+        self, page_number: int, page_size: int, raw: bool = False
+    ) -> Optional[List[PersonShort]]:
+        cache_key = self._build_cache_key(
+            [
+                await self._generation_value(),
+                CacheValue(name='list', value='all'),
+                CacheValue(name='page', value=page_number),
+                CacheValue(name='size', value=page_size),
+            ]
+        )
+        return await self._cached(
+            cache_key,
+            lambda: self._get_list_from_elastic(
+                {"query": {"match_all": {}}}, page_number, page_size
+            ),
+            PersonShort,
+            PERSON_LIST_CACHE_EXPIRE_IN_SECONDS,
+            many=True,
+            raw=raw,
         )
-        return [Person(**d["_source"]) for d in doc["hits"]["hits"]]
 
     async def search(
-        self, page_number: int, page_size: int, query: str
-    ) -> Optional[List[Person]]:
+        self, page_number: int, page_size: int, query: str, raw: bool = False
+    ) -> Optional[List[PersonShort]]:
         body = {
             "query": {
                 "multi_match": {
@@ -58,38 +90,50 @@ class PersonService(ServiceMixin):
         }
 
         cache_key = self._build_cache_key(
-            [CacheValue(name='query', value=query)]
+            [
+                await self._generation_value(),
+                CacheValue(name='query', value=query),
+                CacheValue(name='page', value=page_number),
+                CacheValue(name='size', value=page_size),
+                # Раньше под этими ключами лежали полные Person.
+                CacheValue(name='view', value='short'),
+            ]
+        )
+        return await self._cached(
+            cache_key,
+            lambda: self._get_list_from_elastic(body, page_number, page_size),
+            PersonShort,
+            PERSON_LIST_CACHE_EXPIRE_IN_SECONDS,
+            many=True,
+            raw=raw,
         )
-        persons: List[Person] = await self._get_list_from_cache(cache_key)
-        if not persons:
-            doc = await self.elastic.search(
-                index=self._index_name,
-                body=body,
-                from_=(page_number - 1) * page_size,
-                size=page_size,
-            )
-            persons = [Person(**d["_source"]) for d in doc["hits"]["hits"]]
-            await self._put_list_to_cache(cache_key, persons)
-        return persons
-
-    async def _get_list_from_cache(self, cache_key: str) -> Optional[List[Person]]:
-        data: str = await self.redis.get(cache_key)
-
-        if not data:
-            return None
 
-        data_list: ListCache = ListCache.parse_raw(data)
-        persons: list[Person] = [
-            Person.parse_raw(p_data) for p_data in data_list.__root__
+    async def _get_list_from_elastic(
+        self, body: dict, page_number: int, page_size: int
+    ) -> List[PersonShort]:
+        response = await self.elastic.search(
+            index=self._index_name,
+            body={**body, "_source": PERSON_SHORT_SOURCE},
+            from_=(page_number - 1) * page_size,
+            size=page_size,
+            filter_path=PERSON_LIST_FILTER_PATH,
+        )
+        return [
+            _person_short(d["_source"])
+            # Без совпадений filter_path оставляет пустой ответ.
+            for d in response.get("hits", {}).get("hits", [])
         ]
-        return persons
 
-    async def _get_list_from_elastic(self, body: dict) -> List[Person]:
-        response = self.elastic.search(
-            index="persons",
-            body=body,
-        )
-        return [Person(**d["_source"]) for d in response["hits"]["hits"]]
+    async def _get_person_short_from_elastic(
+        self, person_id: str
+    ) -> Optional[PersonShort]:
+        try:
+            doc = await self.elastic.get(
+                self._index_name, person_id, _source_includes=PERSON_SHORT_SOURCE
+            )
+        except NotFoundError:
+            return None
+        return _person_short(doc["_source"])
 
     async def _get_person_from_elastic(self, person_id: str) -> Optional[Person]:
         try:
@@ -98,22 +142,13 @@ class PersonService(ServiceMixin):
             return None
         return Person(**doc["_source"])
 
-    async def _person_from_cache(self, person_id: str) -> Optional[Person]:
-        data = await self.redis.get(person_id)
-        if not data:
-            return None
-        person = Person.parse_raw(data)
-        return person
-
-    async def _put_person_to_cache(self, cache_key: str, person: Person):
-        await self.redis.set(
-            cache_key, person.json(), expire=PERSON_CACHE_EXPIRE_IN_SECONDS
-        )
 
-    async def _put_list_to_cache(self, cache_key: str, persons: List[Person]):
-        data = [f.json() for f in persons]
-        data_row = ListCache.parse_obj(data).json()
-        await self.redis.set(cache_key, data_row, expire=FILM_CACHE_EXPIRE_IN_SECONDS)
+def _person_short(source: dict) -> PersonShort:
+    return PersonShort(
+        id=source["id"],
+        name=source["name"],
+        films_ids=[FilmId(**f) for f in source.get("films") or []],
+    )
 
 
 @lru_cache()
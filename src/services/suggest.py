@@ -0,0 +1,96 @@
+from functools import lru_cache
+
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+
+from core.config import settings
+from db.elastic import get_elastic
+from db.redis import get_redis
+from models.data_models import FilmSuggestion, PersonSuggestion
+from models.projection import source_includes
+from services import cache
+from services.tools import CacheValue, ServiceMixin
+
+SUGGEST_CACHE_EXPIRE_IN_SECONDS = settings.SUGGEST_CACHE_EXPIRE_IN_SECONDS
+# Поле с подполем suggest (edge n-gram) и модель подсказки для каждого индекса.
+SUGGEST_FIELDS = {
+    'movies': ('title', FilmSuggestion),
+    'persons': ('name', PersonSuggestion),
+}
+SUGGEST_FILTER_PATH = 'hits.hits._source'
+
+
+class SuggestService(ServiceMixin):
+    """
+    Подсказки при наборе текста: один match по n-граммам начал слов без
+    fuzziness, подсчета total и лишних полей в ответе. Запросы на каждое
+    нажатие клавиши кешируются отдельно от поиска с коротким TTL.
+    """
+
+    def __init__(self, redis: Redis, elastic: AsyncElasticsearch, index_name: str):
+        self.redis = redis
+        self.elastic = elastic
+        self._index_name = index_name
+        self._field, self._model = SUGGEST_FIELDS[index_name]
+
+    @property
+    def _local_cache(self) -> cache.LocalCache:
+        return cache.local_caches['suggest']
+
+    async def suggest(self, query: str, size: int, raw: bool = False) -> list:
+        # Регистр и пробелы не меняют результат, но дробили бы кеш.
+        query = ' '.join(query.lower().split())
+        if not query:
+            return b'[]' if raw else []
+        cache_key = self._build_cache_key(
+            [
+                await self._generation_value(),
+                CacheValue(name='suggest', value=query),
+                CacheValue(name='size', value=size),
+            ]
+        )
+        return await self._cached(
+            cache_key,
+            lambda: self._suggest_from_elastic(query, size),
+            self._model,
+            SUGGEST_CACHE_EXPIRE_IN_SECONDS,
+            many=True,
+            raw=raw,
+        )
+
+    async def _suggest_from_elastic(self, query: str, size: int) -> list:
+        response = await self.elastic.search(
+            index=self._index_name,
+            body={
+                "query": {
+                    "match": {
+                        f"{self._field}.suggest": {"query": query, "operator": "and"}
+                    }
+                },
+                "_source": source_includes(self._model),
+                "size": size,
+                "track_total_hits": False,
+            },
+            filter_path=SUGGEST_FILTER_PATH,
+        )
+        return [
+            self._model(**d["_source"])
+            for d in response.get("hits", {}).get("hits", [])
+        ]
+
+
+@lru_cache()
+def get_film_suggest_service(
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> SuggestService:
+    return SuggestService(redis, elastic, 'movies')
+
+
+@lru_cache()
+def get_person_suggest_service(
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> SuggestService:
+    return SuggestService(redis, elastic, 'persons')
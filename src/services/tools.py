@@ -1,13 +1,61 @@
+import asyncio
+import base64
+import zlib
+from functools import partial
+from time import monotonic, time
+from typing import Any, Awaitable, Callable, Optional, Type
+
+import orjson
+from aioredis import Redis
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from pydantic import BaseModel
 
+from core.config import settings
+from services import cache, codec
+
+# Как часто проверять redis, пока ключ загружает другой воркер.
+LOCK_POLL_INTERVAL = 0.02
+
 
 class CacheValue(BaseModel):
     name: str
     value: str
 
 
+class PageError(ValueError):
+    """Страницу нельзя получить: неверный токен или слишком глубокий from/size."""
+
+
+def encode_page_token(sort_values: list) -> str:
+    """Непрозрачный токен следующей страницы из значений sort последнего документа."""
+    return base64.urlsafe_b64encode(orjson.dumps(sort_values)).decode()
+
+
+def decode_page_token(token: str) -> list:
+    try:
+        sort_values = orjson.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError as e:
+        raise PageError('invalid page token') from e
+    if not isinstance(sort_values, list):
+        raise PageError('invalid page token')
+    return sort_values
+
+
+def pack_cache_entry(data: bytes, fresh_until: float) -> bytes:
+    """Значение для redis: первая строка - unix-время, до которого оно свежее."""
+    return b'%.3f\n' % fresh_until + data
+
+
+def unpack_cache_entry(raw: bytes) -> tuple[float, bytes]:
+    header, _, data = raw.partition(b'\n')
+    return float(header), data
+
+
 class ServiceMixin:
+    # Имя алиаса в elasticsearch, которое ETL переключает между версиями индекса.
     _index_name: str
+    redis: Redis
+    elastic: AsyncElasticsearch
 
     def _build_cache_key(self, cache_values: list[CacheValue]) -> str:
         separate = ':'
@@ -15,4 +63,234 @@ class ServiceMixin:
         for v in cache_values:
             key += f'{v.name}{separate}{v.value}'
 
-        return key
\ No newline at end of file
+        return key
+
+    @property
+    def _local_cache(self) -> cache.LocalCache:
+        return cache.local_caches[self._index_name]
+
+    async def _from_cache(
+        self, cache_key: str, model: Type[BaseModel], many: bool = False
+    ) -> Optional[cache.CacheEntry]:
+        """Запись из локального кеша процесса, а при промахе - из redis."""
+        entry = self._local_cache.get(cache_key)
+        if entry is not None:
+            return entry
+        return await self._from_redis(cache_key, model, many)
+
+    async def _from_redis(
+        self, cache_key: str, model: Type[BaseModel], many: bool = False
+    ) -> Optional[cache.CacheEntry]:
+        raw = await self.redis.get(cache_key)
+        entry = self._entry_from_redis(raw, model, many)
+        if entry is not None:
+            self._local_cache.set(cache_key, entry)
+        return entry
+
+    @staticmethod
+    def _entry_from_redis(
+        raw: Optional[bytes], model: Type[BaseModel], many: bool = False
+    ) -> Optional[cache.CacheEntry]:
+        if not raw:
+            return None
+        try:
+            fresh_until, data = unpack_cache_entry(raw)
+            return cache.CacheEntry(codec.decode(data), fresh_until, model, many)
+        except (ValueError, zlib.error):
+            # Запись старого или чужого формата считается промахом.
+            return None
+
+    async def _cached(
+        self,
+        cache_key: str,
+        load: Callable[[], Awaitable[Optional[Any]]],
+        model: Type[BaseModel],
+        expire: int,
+        many: bool = False,
+        raw: bool = False,
+    ) -> Optional[Any]:
+        """
+        Значение из кеша, а при промахе - из load() с сохранением в кеш.
+        Одновременные промахи по одному ключу в процессе ждут одну загрузку.
+        Устаревшее значение (старше мягкого TTL, но моложе expire) отдается
+        сразу, а обновляется одной фоновой загрузкой.
+        С raw=True возвращается готовое JSON-тело ответа вместо моделей.
+        """
+        reload = partial(self._load_to_cache, cache_key, load, model, expire, many)
+        entry = await self._from_cache(cache_key, model, many)
+        if entry is not None:
+            if entry.fresh_until < time():
+                cache.single_flight.refresh(cache_key, reload)
+        else:
+            entry = await cache.single_flight.do(cache_key, reload)
+            if entry is None:
+                return None
+        return entry.body if raw else entry.value
+
+    async def _load_to_cache(
+        self, cache_key, load, model, expire, many
+    ) -> Optional[cache.CacheEntry]:
+        """
+        С CACHE_LOCK_TIMEOUT_MS загрузку ключа ведет один воркер: остальные
+        ждут появления значения в redis и грузят сами, только если не дождались.
+        """
+        lock_key = f'lock:{cache_key}'
+        locked = False
+        if settings.CACHE_LOCK_TIMEOUT_MS:
+            locked = await self.redis.set(
+                lock_key,
+                '1',
+                pexpire=settings.CACHE_LOCK_TIMEOUT_MS,
+                exist=self.redis.SET_IF_NOT_EXIST,
+            )
+            if not locked:
+                entry = await self._wait_for_cache(cache_key, model, many)
+                if entry is not None:
+                    cache.single_flight.lock_deduplicated += 1
+                    return entry
+        try:
+            value = await load()
+            if value is None:
+                # Документ удален: устаревшую копию больше не отдаем.
+                self._local_cache.delete(cache_key)
+                await self.redis.delete(cache_key)
+                return None
+            return await self._put_to_cache(cache_key, value, model, expire, many)
+        finally:
+            if locked:
+                await self.redis.delete(lock_key)
+
+    async def _wait_for_cache(
+        self, cache_key: str, model: Type[BaseModel], many: bool
+    ) -> Optional[cache.CacheEntry]:
+        """Дождаться свежего значения, которое загружает другой воркер."""
+        deadline = monotonic() + settings.CACHE_LOCK_TIMEOUT_MS / 1000
+        while monotonic() < deadline:
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+            entry = await self._from_redis(cache_key, model, many)
+            if entry is not None and entry.fresh_until >= time():
+                return entry
+        return None
+
+    async def _put_to_cache(
+        self,
+        cache_key: str,
+        value: Any,
+        model: Type[BaseModel],
+        expire: int,
+        many: bool,
+    ) -> cache.CacheEntry:
+        entry, data = self._new_entry(cache_key, value, model, expire, many)
+        await self.redis.set(cache_key, data, expire=expire)
+        return entry
+
+    def _new_entry(
+        self,
+        cache_key: str,
+        value: Any,
+        model: Type[BaseModel],
+        expire: int,
+        many: bool = False,
+    ) -> tuple[cache.CacheEntry, bytes]:
+        """Запись в локальный кеш и значение для redis."""
+        # Мягкий TTL не длиннее жизни ключа, иначе фоновое обновление не успеет.
+        soft_expire = settings.CACHE_SOFT_EXPIRE_IN_SECONDS or expire
+        fresh_until = time() + min(soft_expire, expire)
+        body = codec.to_json(value)
+        entry = cache.CacheEntry(body, fresh_until, model, many, value)
+        self._local_cache.set(cache_key, entry)
+        return entry, pack_cache_entry(codec.encode(body), fresh_until)
+
+    async def _mget_cached(
+        self,
+        ids: list[str],
+        id_name: str,
+        model: Type[BaseModel],
+        expire: int,
+        raw: bool = False,
+    ) -> Any:
+        """
+        Документы по списку id в порядке запроса, None для несуществующих.
+        Локальный кеш, затем один MGET в redis, затем один mget в elasticsearch
+        только для промахов и запись найденного одним пайплайном SET EX.
+        С raw=True возвращается готовое JSON-тело массива.
+        """
+        keys = {
+            doc_id: self._build_cache_key([CacheValue(name=id_name, value=doc_id)])
+            for doc_id in ids
+        }
+        entries = {}
+        for doc_id, key in keys.items():
+            entry = self._local_cache.get(key)
+            if entry is not None:
+                entries[doc_id] = entry
+        missing = [doc_id for doc_id in keys if doc_id not in entries]
+        if missing:
+            raws = await self.redis.mget(*[keys[doc_id] for doc_id in missing])
+            for doc_id, raw_entry in zip(missing, raws):
+                entry = self._entry_from_redis(raw_entry, model)
+                if entry is not None:
+                    self._local_cache.set(keys[doc_id], entry)
+                    entries[doc_id] = entry
+            missing = [doc_id for doc_id in missing if doc_id not in entries]
+        if missing:
+            entries.update(await self._mget_to_cache(keys, missing, model, expire))
+
+        now = time()
+        for doc_id, entry in entries.items():
+            if entry is not None and entry.fresh_until < now:
+                load = partial(self._get_from_elastic, doc_id, model)
+                reload = partial(
+                    self._load_to_cache, keys[doc_id], load, model, expire, False
+                )
+                cache.single_flight.refresh(keys[doc_id], reload)
+        if raw:
+            return b'[' + b','.join(
+                entries[doc_id].body if entries[doc_id] else b'null' for doc_id in ids
+            ) + b']'
+        return [entries[doc_id].value if entries[doc_id] else None for doc_id in ids]
+
+    async def _mget_to_cache(
+        self,
+        keys: dict[str, str],
+        ids: list[str],
+        model: Type[BaseModel],
+        expire: int,
+    ) -> dict[str, Optional[cache.CacheEntry]]:
+        response = await self.elastic.mget(body={'ids': ids}, index=self._index_name)
+        entries = {}
+        pipe = self.redis.pipeline()
+        for doc in response['docs']:
+            doc_id = doc['_id']
+            if not doc.get('found'):
+                entries[doc_id] = None
+                continue
+            entry, data = self._new_entry(
+                keys[doc_id], model(**doc['_source']), model, expire
+            )
+            entries[doc_id] = entry
+            pipe.set(keys[doc_id], data, expire=expire)
+        await pipe.execute()
+        return entries
+
+    async def _get_from_elastic(
+        self, doc_id: str, model: Type[BaseModel]
+    ) -> Optional[BaseModel]:
+        try:
+            doc = await self.elastic.get(self._index_name, doc_id)
+        except NotFoundError:
+            return None
+        return model(**doc['_source'])
+
+    async def _generation_value(self) -> CacheValue:
+        """
+        Поколение индекса для ключей списков и поиска. ETL увеличивает его
+        после каждой загрузки, и все старые списки перестают читаться.
+        """
+        generation = cache.get_generation(self._index_name)
+        if generation is None:
+            seen_events = cache.events
+            data = await self.redis.get(f'{self._index_name}:generation')
+            generation = data.decode() if data else '0'
+            cache.set_generation(self._index_name, generation, seen_events)
+        return CacheValue(name='generation', value=generation)
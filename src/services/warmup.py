@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from math import ceil
+from time import monotonic
+from typing import Optional
+
+from aioredis import Redis
+
+from core.config import settings
+from models.data_models import FilmFilter
+from models.enums import SortTypes
+from services import genre_catalogue
+from services.films import FilmService
+
+# Прогрев ведет один воркер API, остальные пропускают его.
+WARMUP_LOCK = 'warmup:lock'
+WARMUP_LOCK_EXPIRE = 60
+# Индексы, после загрузки которых меняются прогреваемые страницы.
+WARMUP_INDEXES = ('movies', 'genres')
+
+
+class Warmer:
+    """
+    Заполняет кеш предсказуемыми запросами: первыми страницами списка
+    фильмов для всех сочетаний сортировки и жанра из каталога, фасетами
+    без фильтра и топом фильмов по рейтингу. Запросы идут через обычные методы сервиса
+    параллельно, но не больше WARMUP_CONCURRENCY одновременно.
+    """
+
+    def __init__(self, redis: Redis, film_service: FilmService):
+        self.redis = redis
+        self.film_service = film_service
+        # Отложенный прогрев и время первого события, которое его ждет.
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._first_event: Optional[float] = None
+
+    async def run(self) -> None:
+        locked = await self.redis.set(
+            WARMUP_LOCK,
+            '1',
+            expire=WARMUP_LOCK_EXPIRE,
+            exist=self.redis.SET_IF_NOT_EXIST,
+        )
+        if not locked:
+            return
+        started = monotonic()
+        try:
+            semaphore = asyncio.Semaphore(settings.WARMUP_CONCURRENCY)
+            results = await asyncio.gather(
+                *[self._bounded(semaphore, job) for job in self._jobs()],
+                return_exceptions=True,
+            )
+            results.append(await self._top_films(semaphore))
+        finally:
+            await self.redis.delete(WARMUP_LOCK)
+        errors = [r for r in results if isinstance(r, Exception)]
+        for error in errors[:1]:
+            logging.error('Cache warm-up request failed.', exc_info=error)
+        logging.info(
+            'Cache warmed up: %d requests, %d failed, %.2fs.',
+            len(results),
+            len(errors),
+            monotonic() - started,
+        )
+
+    def schedule(self, index: str) -> None:
+        """
+        Прогрев после события ETL. События приходят на каждую пачку,
+        поэтому каждое событие откладывает прогрев: он начнется, когда
+        событий не было WARMUP_DEBOUNCE секунд, но не позже WARMUP_MAX_DELAY
+        после первого из них, даже если загрузка идет без пауз.
+        """
+        if index not in WARMUP_INDEXES:
+            return
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        if self._first_event is None:
+            self._first_event = now
+        if self._timer is not None:
+            self._timer.cancel()
+        deadline = self._first_event + settings.WARMUP_MAX_DELAY
+        delay = max(0.0, min(settings.WARMUP_DEBOUNCE, deadline - now))
+        self._timer = loop.call_later(delay, self._start)
+
+    def _start(self) -> None:
+        self._timer = None
+        self._first_event = None
+        asyncio.ensure_future(self.warm_up())
+
+    async def warm_up(self) -> None:
+        """Фоновый прогрев: ошибки только логируются."""
+        try:
+            await self.run()
+        except Exception:
+            logging.exception('Cache warm-up failed.')
+
+    def _jobs(self):
+        catalogue = genre_catalogue.catalogue
+        genres = [genre.name for genre in catalogue.genres] if catalogue else []
+        for sort in ('', *map(str, SortTypes)):
+            for genre in ('', *genres):
+                yield self.film_service.get_all_films(
+                    sort,
+                    FilmFilter(genres=[genre] if genre else []),
+                    1,
+                    settings.DEFAULT_PAGE_SIZE,
+                    raw=True,
+                )
+        yield self.film_service.get_facets(FilmFilter(), raw=True)
+
+    async def _top_films(self, semaphore: asyncio.Semaphore):
+        """Страницы топа по рейтингу и карточки этих фильмов."""
+        pages = ceil(settings.WARMUP_TOP_FILMS / settings.DEFAULT_PAGE_SIZE)
+        try:
+            results = await asyncio.gather(
+                *[
+                    self._bounded(
+                        semaphore,
+                        self.film_service.get_all_films(
+                            str(SortTypes.rating),
+                            FilmFilter(),
+                            page_number,
+                            settings.DEFAULT_PAGE_SIZE,
+                        ),
+                    )
+                    for page_number in range(1, pages + 1)
+                ]
+            )
+            ids = [film.id for page in results for film in page.items]
+            ids = ids[: settings.WARMUP_TOP_FILMS]
+            if ids:
+                await self.film_service.get_many(ids, raw=True)
+        except Exception as e:
+            return e
+
+    @staticmethod
+    async def _bounded(semaphore: asyncio.Semaphore, job):
+        async with semaphore:
+            return await job
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули ETL и API импортируются без пакета, как при запуске из ETL/ и src/.
+sys.path[:0] = [os.path.join(ROOT, "ETL"), os.path.join(ROOT, "src")]
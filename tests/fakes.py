@@ -0,0 +1,152 @@
+"""Заглушки redis и elasticsearch в памяти для тестов сервисов API."""
+import json
+from typing import Optional
+
+from elasticsearch import NotFoundError
+
+
+def film(film_id: str, **fields) -> dict:
+    return {
+        "id": film_id,
+        "title": f"Film {film_id}",
+        "rating": 5.0,
+        "type": "movie",
+        "description": "",
+        "genres": [],
+        "directors": [],
+        "writers": [],
+        "actors": [],
+        **fields,
+    }
+
+
+class FakeRedis:
+    """Подмножество API aioredis 1.3, которым пользуются сервисы."""
+
+    SET_IF_NOT_EXIST = "SET_IF_NOT_EXIST"
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.mget_calls = 0
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, *keys):
+        self.mget_calls += 1
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, expire=0, pexpire=0, exist=None):
+        if exist == self.SET_IF_NOT_EXIST and key in self.data:
+            return False
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        self.expires[key] = expire
+        return True
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+
+    async def execute(self):
+        for args, kwargs in self.commands:
+            await self.redis.set(*args, **kwargs)
+
+
+class SyncRedis:
+    """Синхронный redis-py поверх тех же данных, как его видит ETL."""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return SyncPipeline(self)
+
+
+class SyncPipeline:
+    def __init__(self, client: SyncRedis):
+        self.client = client
+        self.commands = []
+
+    def delete(self, *keys):
+        self.commands.append(("delete", keys))
+
+    def incr(self, key):
+        self.commands.append(("incr", key))
+
+    def publish(self, channel, message):
+        self.commands.append(("publish", (channel, message)))
+
+    def execute(self):
+        data = self.client.redis.data
+        for command, args in self.commands:
+            if command == "delete":
+                for key in args:
+                    data.pop(key, None)
+            elif command == "incr":
+                data[args] = str(int(data.get(args, b"0")) + 1).encode()
+            else:
+                self.client.published.append(args)
+
+
+class FakeElasticsearch:
+    """Документы по индексам; search отдает их по from/size или ответ из теста."""
+
+    def __init__(self, docs: Optional[dict] = None):
+        self.docs = {
+            index: {doc["id"]: doc for doc in items}
+            for index, items in (docs or {}).items()
+        }
+        self.searches = []
+        self.search_response = None
+        self.gets = 0
+        self.mgets = []
+
+    async def get(self, index, id, **kwargs):
+        self.gets += 1
+        try:
+            return {"_id": id, "_source": self.docs[index][id]}
+        except KeyError:
+            raise NotFoundError(404, "not_found", {})
+
+    async def mget(self, body, index):
+        self.mgets.append(body["ids"])
+        docs = self.docs.get(index, {})
+        return {
+            "docs": [
+                {"_id": i, "found": True, "_source": docs[i]}
+                if i in docs
+                else {"_id": i, "found": False}
+                for i in body["ids"]
+            ]
+        }
+
+    async def search(self, index, body=None, **kwargs):
+        # Копия через JSON: сервис не должен зависеть от изменения тела после запроса.
+        self.searches.append((index, json.loads(json.dumps(body)), kwargs))
+        if self.search_response is not None:
+            return self.search_response
+        docs = sorted(self.docs.get(index, {}).values(), key=lambda d: d["id"])
+        start = kwargs.get("from_", body.get("from", 0))
+        if "search_after" in body:
+            start = sum(doc["id"] <= body["search_after"][-1] for doc in docs)
+        hits = docs[start:start + kwargs.get("size", body.get("size", 10))]
+        return {
+            "hits": {
+                "total": {"value": len(docs), "relation": "eq"},
+                "hits": [{"_source": doc, "sort": [doc["id"]]} for doc in hits],
+            }
+        }
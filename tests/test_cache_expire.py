@@ -0,0 +1,45 @@
+import asyncio
+from time import time
+
+import pytest
+
+pytest.importorskip("aioredis")
+
+from core.config import settings  # noqa: E402
+from models.data_models import Film, FilmFilter  # noqa: E402
+from services import cache  # noqa: E402
+from services.films import FilmService  # noqa: E402
+from services.tools import unpack_cache_entry  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis, film  # noqa: E402
+
+
+@pytest.fixture
+def service():
+    cache.clear_all()
+    yield FilmService(FakeRedis(), FakeElasticsearch({"movies": [film("1")]}))
+    cache.clear_all()
+
+
+def test_documents_keep_long_expire_and_lists_expire_soon(service):
+    async def main():
+        await service.get_by_id("1")
+        await service.get_all_films("", FilmFilter(), 1, 10)
+        await service.search("Film", 1, 10)
+
+    asyncio.run(main())
+
+    expires = service.redis.expires
+    assert expires.pop("movies:film_id:1") == settings.CACHE_EXPIRE_IN_SECONDS
+    assert len(expires) == 2
+    assert set(expires.values()) == {settings.CACHE_LIST_EXPIRE_IN_SECONDS}
+    assert settings.CACHE_LIST_EXPIRE_IN_SECONDS < settings.CACHE_EXPIRE_IN_SECONDS
+
+
+def test_soft_expire_does_not_outlive_key(service, monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_SOFT_EXPIRE_IN_SECONDS", 300)
+    value = Film(**film("1"))
+    _, redis_value = service._new_entry("movies:film_id:1", value, Film, expire=60)
+
+    fresh_until, _ = unpack_cache_entry(redis_value)
+    # Время в значении округлено до миллисекунд.
+    assert fresh_until <= time() + 60.001
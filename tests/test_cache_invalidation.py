@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("aioredis")
+
+import invalidation  # noqa: E402
+from services import cache  # noqa: E402
+from services.films import FilmService  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis, SyncRedis, film  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    cache.clear_all()
+    yield
+    cache.clear_all()
+
+
+def test_etl_and_api_agree_on_keys_and_channel():
+    assert invalidation.CACHE_ID_KEYS == cache.CACHE_ID_KEYS
+    assert invalidation.CHANNEL == cache.INVALIDATION_CHANNEL
+
+
+def test_invalidator_drops_api_cache_entry_and_bumps_generation():
+    redis = FakeRedis()
+    service = FilmService(redis, FakeElasticsearch({"movies": [film("1")]}))
+    asyncio.run(service.get_by_id("1"))
+    assert list(redis.data) == ["movies:film_id:1"]
+    generation = asyncio.run(service._generation_value())
+
+    sync_redis = SyncRedis(redis)
+    invalidation.CacheInvalidator(sync_redis).invalidate("movies", ["1"])
+
+    assert "movies:film_id:1" not in redis.data
+    assert asyncio.run(service._generation_value()).value != generation.value
+    channel, message = sync_redis.published[0]
+    assert json.loads(message) == {"index": "movies", "ids": ["1"]}
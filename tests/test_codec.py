@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+pytest.importorskip("orjson")
+pytest.importorskip("pydantic")
+
+from core.config import settings  # noqa: E402
+from models.data_models import Film  # noqa: E402
+from services import codec  # noqa: E402
+from tests.fakes import film  # noqa: E402
+
+
+@pytest.fixture
+def compress(monkeypatch):
+    monkeypatch.setattr(settings, "CACHE_COMPRESS_MIN_BYTES", 64)
+
+
+def test_large_body_is_compressed_and_restored(compress):
+    body = b'{"description":"' + b"a" * 1000 + b'"}'
+    data = codec.encode(body)
+
+    assert data[:1] == codec.ZLIB
+    assert len(data) < len(body)
+    assert codec.decode(data) == body
+
+
+def test_small_or_incompressible_body_is_stored_raw(compress):
+    small = b'{"id":"1"}'
+    noise = os.urandom(512)
+
+    assert codec.encode(small) == codec.RAW + small
+    assert codec.encode(noise) == codec.RAW + noise
+    assert codec.decode(codec.encode(noise)) == noise
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        codec.decode(b'x{}')
+
+
+def test_models_round_trip_with_nested_models(compress):
+    value = Film(
+        **film(
+            "1",
+            genres=[{"id": "g", "name": "Drama"}],
+            actors=[{"id": str(i), "name": f"Actor {i}"} for i in range(20)],
+        )
+    )
+    body = codec.decode(codec.encode(codec.to_json(value)))
+    restored = codec.from_json(Film, body)
+
+    assert restored == value
+    assert restored.actors[0].name == "Actor 0"
+    assert codec.from_json(Film, codec.to_json([value]), many=True) == [value]
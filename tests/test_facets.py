@@ -0,0 +1,72 @@
+import asyncio
+
+import orjson
+import pytest
+
+pytest.importorskip("aioredis")
+
+from models.data_models import FilmFilter  # noqa: E402
+from services import cache, genre_catalogue  # noqa: E402
+from services.films import FilmService  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis  # noqa: E402
+
+RESPONSE = {
+    "aggregations": {
+        "filtered": {"doc_count": 3},
+        "genres": {"nested": {"ids": {"buckets": [{"key": "g1", "doc_count": 2}]}}},
+        "types": {"values": {"buckets": [{"key": "movie", "doc_count": 3}]}},
+    }
+}
+FILTER = FilmFilter(genres=["Drama"], rating_min=5, types=["movie"])
+
+
+@pytest.fixture
+def service(monkeypatch):
+    cache.clear_all()
+    monkeypatch.setattr(genre_catalogue, "catalogue", None)
+    elastic = FakeElasticsearch()
+    elastic.search_response = RESPONSE
+    yield FilmService(FakeRedis(), elastic)
+    cache.clear_all()
+
+
+def test_facets_query_uses_filter_context(service):
+    asyncio.run(service.get_facets(FILTER))
+
+    _, body, _ = service.elastic.searches[0]
+    assert body["size"] == 0
+    assert body["query"] == {"bool": {"filter": [{"range": {"rating": {"gte": 5}}}]}}
+    aggs = body["aggs"]
+    filtered = aggs["filtered"]["filter"]["bool"]["filter"]
+    assert [next(iter(clause)) for clause in filtered] == ["nested", "terms"]
+    # Каждый фасет не учитывает собственный фильтр.
+    assert aggs["genres"]["filter"] == {
+        "bool": {"filter": [{"terms": {"type": ["movie"]}}]}
+    }
+    assert next(iter(aggs["types"]["filter"]["bool"]["filter"][0])) == "nested"
+
+
+def test_list_filter_goes_to_bool_filter(service):
+    service.elastic.search_response = {
+        "hits": {"total": {"value": 0, "relation": "eq"}, "hits": []}
+    }
+    asyncio.run(service.get_all_films("", FILTER, 1, 10))
+
+    _, body, _ = service.elastic.searches[0]
+    assert set(body["query"]) == {"bool"}
+    assert set(body["query"]["bool"]) == {"filter"}
+    assert len(body["query"]["bool"]["filter"]) == 3
+
+
+def test_facets_are_cached_per_filter(service):
+    async def main():
+        first = await service.get_facets(FILTER, raw=True)
+        second = await service.get_facets(FILTER, raw=True)
+        await service.get_facets(FilmFilter(), raw=True)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first == second
+    assert orjson.loads(first)["total"] == 3
+    assert len(service.elastic.searches) == 2
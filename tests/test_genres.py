@@ -0,0 +1,91 @@
+import orjson
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.v1 import films, genre  # noqa: E402
+from models.data_models import Genre  # noqa: E402
+from services import cache, genre_catalogue  # noqa: E402
+from services.films import FilmService, get_film_service  # noqa: E402
+from services.genre_catalogue import GenreCatalogue  # noqa: E402
+from services.genres import GenreService, get_genre_service  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis, film  # noqa: E402
+
+GENRES = [{"id": "g2", "name": "drama"}, {"id": "g1", "name": "Comedy"}]
+
+
+@pytest.fixture
+def elastic():
+    return FakeElasticsearch({"movies": [film("1")], "genres": GENRES})
+
+
+@pytest.fixture
+def client(elastic, monkeypatch):
+    cache.clear_all()
+    monkeypatch.setattr(genre_catalogue, "catalogue", None)
+    app = FastAPI()
+    app.include_router(films.router, prefix="/api/v1/films")
+    app.include_router(genre.router, prefix="/api/v1/genre")
+    app.dependency_overrides[get_film_service] = lambda: FilmService(
+        FakeRedis(), elastic
+    )
+    app.dependency_overrides[get_genre_service] = lambda: GenreService(
+        FakeRedis(), elastic
+    )
+    yield TestClient(app)
+    cache.clear_all()
+
+
+def genres_clause(elastic):
+    _, body, _ = elastic.searches[-1]
+    clauses = body["query"]["bool"]["filter"]
+    return next(c["nested"]["query"] for c in clauses if "nested" in c)
+
+
+def test_catalogue_lookups():
+    catalogue = GenreCatalogue(Genre(**g) for g in GENRES)
+
+    assert [g.id for g in catalogue.genres] == ["g1", "g2"]
+    assert catalogue.find("DRAMA").id == "g2"
+    bodies = orjson.loads(catalogue.bodies(["g2", "x"]))
+    assert [body and body["id"] for body in bodies] == ["g2", None]
+    assert [g["id"] for g in orjson.loads(catalogue.page_body(2, 1))] == ["g2"]
+
+
+def test_genre_list_validates_paging(client):
+    assert client.get("/api/v1/genre/", params={"page_size": 0}).status_code == 422
+    assert client.get("/api/v1/genre/", params={"page_size": 101}).status_code == 422
+    assert client.get("/api/v1/genre/").status_code == 422
+    response = client.get("/api/v1/genre/", params={"page_size": 1, "page_number": 0})
+    assert response.status_code == 422
+
+
+def test_genre_list_defaults_to_first_page(client, monkeypatch):
+    catalogue = GenreCatalogue(Genre(**g) for g in GENRES)
+    monkeypatch.setattr(genre_catalogue, "catalogue", catalogue)
+
+    response = client.get("/api/v1/genre/", params={"page_size": 1})
+
+    assert [g["id"] for g in response.json()] == ["g1"]
+
+
+def test_loaded_catalogue_filters_by_genre_id(client, elastic, monkeypatch):
+    catalogue = GenreCatalogue(Genre(**g) for g in GENRES)
+    monkeypatch.setattr(genre_catalogue, "catalogue", catalogue)
+
+    assert client.get("/api/v1/films/", params={"filter": "Unknown"}).status_code == 422
+    assert client.get("/api/v1/films/", params={"filter": "Drama"}).status_code == 200
+    assert genres_clause(elastic) == {"terms": {"genres.id": ["g2"]}}
+
+
+def test_empty_catalogue_falls_back_to_genre_names(client, elastic, monkeypatch):
+    monkeypatch.setattr(genre_catalogue, "catalogue", GenreCatalogue([]))
+
+    response = client.get("/api/v1/films/", params={"filter": "Drama"})
+
+    assert response.status_code == 200
+    match = genres_clause(elastic)["bool"]["should"][0]["match"]
+    assert match == {"genres.name": {"query": "Drama", "operator": "and"}}
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+import load
+from bench_etl import FakeElasticsearch
+from load import Load, LoadError
+from transform import Document
+
+
+class ScriptedElasticsearch(FakeElasticsearch):
+    """
+    Отвечает на документы заданными статусами: по словарю на запрос,
+    последний словарь повторяется для всех следующих запросов.
+    """
+
+    def __init__(self, *statuses: dict):
+        super().__init__()
+        self.statuses = list(statuses)
+        self.bodies = []
+
+    def bulk(self, body, **kwargs):
+        response = super().bulk(body, **kwargs)
+        self.bodies.append(body)
+        statuses = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        for item in response["items"]:
+            (result,) = item.values()
+            status = statuses.get(result["_id"])
+            if status:
+                result.update(status=status, error={"type": "error"})
+                response["errors"] = True
+        return response
+
+
+def sent_ids(body: str) -> list:
+    return [
+        next(iter(json.loads(line).values()))["_id"] for line in body.splitlines()[::2]
+    ]
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(load, "sleep", lambda _: None)
+
+
+def docs(*ids, op_type="index"):
+    return [Document(id=i, body=json.dumps({"id": i}), op_type=op_type) for i in ids]
+
+
+def test_retries_only_documents_rejected_with_retryable_status():
+    es = ScriptedElasticsearch({"2": 429}, {})
+
+    assert Load(es, "movies").load(docs("1", "2", "3")) == 3
+    assert [sent_ids(body) for body in es.bodies] == [["1", "2", "3"], ["2"]]
+
+
+def test_permanent_errors_are_not_retried():
+    es = ScriptedElasticsearch({"1": 400, "2": 503}, {"2": 503})
+
+    with pytest.raises(LoadError) as error:
+        Load(es, "movies").load(docs("1", "2"))
+
+    # 400 отклоняется сразу, 503 повторяется, пока не кончатся попытки.
+    assert [e["_id"] for e in error.value.errors] == ["1", "2"]
+    assert len(es.bodies) == load.BULK_MAX_RETRIES + 1
+    assert all(sent_ids(body) == ["2"] for body in es.bodies[1:])
+
+
+def test_partial_update_of_missing_film_is_skipped():
+    es = ScriptedElasticsearch({"2": 404})
+
+    assert Load(es, "movies").load(docs("1", "2", op_type="update")) == 2
+    assert len(es.bodies) == 1
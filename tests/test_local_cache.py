@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("aioredis")
+
+from services import cache  # noqa: E402
+from services.cache import LocalCache  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache, "monotonic", lambda: now[0])
+    return now
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    local = LocalCache(maxsize=2, ttl=60)
+    local.set("a", 1)
+    local.set("b", 2)
+    assert local.get("a") == 1
+    local.set("c", 3)
+
+    assert local.get("b") is None
+    assert (local.get("a"), local.get("c")) == (1, 3)
+    assert local.stats()["size"] == 2
+
+
+def test_entry_expires_after_ttl(clock):
+    local = LocalCache(maxsize=10, ttl=5)
+    local.set("a", 1)
+    clock[0] += 5
+    assert local.get("a") == 1
+    clock[0] += 0.1
+
+    assert local.get("a") is None
+    assert local.stats()["size"] == 0
+    assert (local.hits, local.misses) == (1, 1)
+
+
+def test_zero_size_disables_cache(clock):
+    local = LocalCache(maxsize=0, ttl=60)
+    local.set("a", 1)
+
+    assert local.get("a") is None
+
+
+def test_invalidate_drops_documents_and_generation(monkeypatch):
+    local = LocalCache(maxsize=10, ttl=60)
+    monkeypatch.setitem(cache.local_caches, "movies", local)
+    monkeypatch.setattr(cache, "subscribed", True)
+    local.set("movies:film_id:1", 1)
+    local.set("movies:film_id:2", 2)
+    cache.set_generation("movies", "3", cache.events)
+
+    cache.invalidate("movies", ["1"])
+
+    assert local.get("movies:film_id:1") is None
+    assert local.get("movies:film_id:2") == 2
+    assert cache.get_generation("movies") is None
+
+
+def test_generation_read_before_event_is_not_stored(monkeypatch):
+    monkeypatch.setattr(cache, "subscribed", True)
+    seen = cache.events
+    cache.invalidate("movies", None)
+    cache.set_generation("movies", "3", seen)
+
+    assert cache.get_generation("movies") is None
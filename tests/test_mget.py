@@ -0,0 +1,57 @@
+import asyncio
+
+import orjson
+import pytest
+
+pytest.importorskip("aioredis")
+
+from services import cache  # noqa: E402
+from services.films import FilmService  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis, film  # noqa: E402
+
+
+@pytest.fixture
+def service():
+    cache.clear_all()
+    elastic = FakeElasticsearch({"movies": [film(str(i)) for i in range(1, 4)]})
+    yield FilmService(FakeRedis(), elastic)
+    cache.clear_all()
+
+
+def test_documents_keep_request_order_with_null_for_missing(service):
+    async def main():
+        await service.get_by_id("1")
+        await service.get_by_id("2")
+        # Второй фильм остается только в redis.
+        cache.local_caches["movies"].delete("movies:film_id:2")
+        return await service.get_many(["3", "404", "1", "2", "1"], raw=True)
+
+    body = asyncio.run(main())
+
+    assert [doc and doc["id"] for doc in orjson.loads(body)] == [
+        "3", None, "1", "2", "1"
+    ]
+    # В elasticsearch уходят только промахи обоих кешей, одним запросом.
+    assert service.elastic.mgets == [["3", "404"]]
+    assert service.redis.mget_calls == 1
+    assert "movies:film_id:3" in service.redis.data
+    assert "movies:film_id:404" not in service.redis.data
+
+
+def test_models_are_returned_without_raw(service):
+    films = asyncio.run(service.get_many(["2", "404"]))
+
+    assert films[0].id == "2"
+    assert films[1] is None
+
+
+def test_repeated_request_is_served_from_cache(service):
+    async def main():
+        await service.get_many(["1", "2"])
+        return await service.get_many(["2", "1"], raw=True)
+
+    body = asyncio.run(main())
+
+    assert [doc["id"] for doc in orjson.loads(body)] == ["2", "1"]
+    assert len(service.elastic.mgets) == 1
+    assert service.redis.mget_calls == 1
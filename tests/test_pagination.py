@@ -0,0 +1,74 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from api.v1 import films  # noqa: E402
+from services import cache  # noqa: E402
+from services.films import FilmService, get_film_service  # noqa: E402
+from services.tools import PageError, decode_page_token, encode_page_token  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis, film  # noqa: E402
+
+
+@pytest.fixture
+def elastic():
+    return FakeElasticsearch({"movies": [film(str(i)) for i in range(1, 6)]})
+
+
+@pytest.fixture
+def client(elastic):
+    cache.clear_all()
+    app = FastAPI()
+    app.include_router(films.router, prefix="/api/v1/films")
+    app.dependency_overrides[get_film_service] = lambda: FilmService(
+        FakeRedis(), elastic
+    )
+    yield TestClient(app)
+    cache.clear_all()
+
+
+def test_page_token_round_trip():
+    sort_values = [8.5, "a2b1c3"]
+    assert decode_page_token(encode_page_token(sort_values)) == sort_values
+
+
+@pytest.mark.parametrize("token", ["not base64!", encode_page_token({"a": 1})])
+def test_invalid_page_token_is_rejected(token):
+    with pytest.raises(PageError):
+        decode_page_token(token)
+
+
+def test_page_and_size_query_params(client, elastic):
+    response = client.get("/api/v1/films/", params={"page": 2, "size": 2})
+
+    assert response.status_code == 200
+    page = response.json()
+    assert [item["id"] for item in page["items"]] == ["3", "4"]
+    assert (page["page"], page["size"], page["total"]) == (2, 2, 5)
+    assert elastic.searches[0][1]["from"] == 2
+
+
+def test_next_page_token_continues_after_last_item(client, elastic):
+    first = client.get("/api/v1/films/", params={"size": 3}).json()
+    second = client.get(
+        "/api/v1/films/", params={"size": 3, "page_token": first["next_page_token"]}
+    ).json()
+
+    assert [item["id"] for item in second["items"]] == ["4", "5"]
+    assert second["page"] is None
+    assert second["next_page_token"] is None
+    assert "from" not in elastic.searches[1][1]
+
+
+def test_deep_page_requires_token(client):
+    response = client.get("/api/v1/films/", params={"page": 1000, "size": 100})
+
+    assert response.status_code == 400
+
+
+def test_invalid_token_is_bad_request(client):
+    response = client.get("/api/v1/films/", params={"page_token": "%%%"})
+
+    assert response.status_code == 400
@@ -0,0 +1,68 @@
+import asyncio
+
+import orjson
+import pytest
+
+pytest.importorskip("aioredis")
+
+import invalidation  # noqa: E402
+from services import cache  # noqa: E402
+from services.persons import PersonService  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis, SyncRedis  # noqa: E402
+
+PERSONS = [
+    {"id": "1", "name": "Ann", "films": [{"id": "f1", "title": "A", "type": "movie"}]},
+    {"id": "2", "name": "Bob", "films": []},
+]
+
+
+@pytest.fixture
+def service():
+    cache.clear_all()
+    yield PersonService(FakeRedis(), FakeElasticsearch({"persons": PERSONS}))
+    cache.clear_all()
+
+
+def test_details_body_is_cached_short_person(service):
+    async def main():
+        return [await service.get_short_by_id("1", raw=True) for _ in range(2)]
+
+    first, second = asyncio.run(main())
+
+    expected = {"id": "1", "name": "Ann", "films_ids": [{"id": "f1"}]}
+    assert orjson.loads(first) == expected
+    assert second == first
+    assert service.elastic.gets == 1
+
+
+def test_missing_person_is_none(service):
+    assert asyncio.run(service.get_short_by_id("404", raw=True)) is None
+
+
+def test_list_pages_are_cached(service):
+    async def main():
+        return [await service.get_list(2, 1, raw=True) for _ in range(2)]
+
+    first, second = asyncio.run(main())
+
+    assert orjson.loads(first) == [{"id": "2", "name": "Bob", "films_ids": []}]
+    assert second == first
+    assert len(service.elastic.searches) == 1
+
+
+def test_invalidation_drops_both_person_views(service):
+    async def main():
+        await service.get_by_id("1")
+        await service.get_short_by_id("1")
+
+    asyncio.run(main())
+    assert set(service.redis.data) == {
+        "persons:person_id:1",
+        "persons:person_short_id:1",
+    }
+
+    invalidation.CacheInvalidator(SyncRedis(service.redis)).invalidate("persons", ["1"])
+    cache.invalidate("persons", ["1"])
+
+    assert set(service.redis.data) == {"persons:generation"}
+    assert cache.local_caches["persons"].stats()["size"] == 0
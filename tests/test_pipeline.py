@@ -0,0 +1,73 @@
+import pytest
+
+from bench_etl import Dataset, FakeConnection, FakeElasticsearch, MemoryStorage
+from load import LoadError
+from pipeline import Checkpointer, Pipeline
+from state import State
+
+FILMS = 3000
+
+
+class CountingElasticsearch(FakeElasticsearch):
+    def __init__(self):
+        super().__init__()
+        self.docs = 0
+
+    def bulk(self, body, **kwargs):
+        response = super().bulk(body, **kwargs)
+        self.docs += len(response["items"])
+        return response
+
+
+class FailingElasticsearch(FakeElasticsearch):
+    """Отклоняет все документы с ошибкой, которую нельзя повторить."""
+
+    def bulk(self, body, **kwargs):
+        response = super().bulk(body, **kwargs)
+        for item in response["items"]:
+            (result,) = item.values()
+            result.update(status=400, error="mapper_parsing_exception")
+        response["errors"] = True
+        return response
+
+
+@pytest.fixture(scope="module")
+def connection():
+    return FakeConnection(Dataset(FILMS, FILMS, 5))
+
+
+def test_checkpointer_moves_only_contiguous_prefix():
+    state = State(MemoryStorage())
+    checkpointer = Checkpointer(state, "movies")
+
+    checkpointer.done(1, {"movies_modified": "2021-01-02T00:00:00+00:00"})
+    checkpointer.done(2, {"movies_modified": "2021-01-03T00:00:00+00:00"})
+    assert state.get_state("movies_modified") is None
+
+    checkpointer.done(0, {"movies_modified": "2021-01-01T00:00:00+00:00"})
+    assert state.get_state("movies_modified") == "2021-01-03T00:00:00+00:00"
+
+    checkpointer.done(4, {"movies_modified": "2021-01-05T00:00:00+00:00"})
+    assert state.get_state("movies_modified") == "2021-01-03T00:00:00+00:00"
+
+
+def test_run_returns_docs_loaded_by_all_workers(connection):
+    es = CountingElasticsearch()
+    pipeline = Pipeline(connection, es, State(MemoryStorage()), load_workers=3)
+
+    loaded = pipeline.run("movies")
+
+    assert es.docs == FILMS
+    assert loaded == FILMS
+
+
+def test_failed_load_raises_without_advancing_state(connection):
+    storage = MemoryStorage()
+    pipeline = Pipeline(
+        connection, FailingElasticsearch(), State(storage), load_workers=2
+    )
+
+    with pytest.raises(LoadError):
+        pipeline.run("movies")
+
+    assert storage.retrieve_state() == {}
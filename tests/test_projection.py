@@ -0,0 +1,60 @@
+import asyncio
+
+import orjson
+import pytest
+
+pytest.importorskip("aioredis")
+
+from models.data_models import Film, FilmFilter, FilmForPerson, FilmPage  # noqa: E402
+from models.projection import (  # noqa: E402
+    FieldsError,
+    page_model,
+    parse_fields,
+    source_includes,
+    sparse_model,
+)
+from services import cache  # noqa: E402
+from services.films import SEARCH_FILTER_PATH, FilmService  # noqa: E402
+from tests.fakes import FakeElasticsearch, FakeRedis, film  # noqa: E402
+
+
+def test_source_includes_nested_model_fields():
+    paths = source_includes(Film)
+
+    assert paths[:4] == ["id", "title", "rating", "type"]
+    assert "genres.name" in paths
+    assert "actors.id" in paths
+    assert "actors" not in paths
+
+
+def test_parse_fields_follows_model_order():
+    assert parse_fields(FilmForPerson, " title,id,") == ("id", "title")
+    assert parse_fields(FilmForPerson, None) == ()
+    with pytest.raises(FieldsError, match="unknown fields: foo"):
+        parse_fields(FilmForPerson, "id,foo")
+
+
+def test_sparse_and_page_models_are_cached_subsets():
+    model = sparse_model(FilmForPerson, ("id", "title"))
+
+    assert list(model.__fields__) == ["id", "title"]
+    assert sparse_model(FilmForPerson, ("id", "title")) is model
+    assert sparse_model(FilmForPerson, ()) is FilmForPerson
+    assert page_model(FilmPage, FilmForPerson) is FilmPage
+    assert page_model(FilmPage, model).__fields__["items"].type_ is model
+
+
+def test_sparse_page_requests_and_returns_only_selected_fields():
+    cache.clear_all()
+    elastic = FakeElasticsearch({"movies": [film("1")]})
+    service = FilmService(FakeRedis(), elastic)
+
+    body = asyncio.run(
+        service.get_all_films("", FilmFilter(), 1, 10, fields=("id",), raw=True)
+    )
+    cache.clear_all()
+
+    _, request, kwargs = elastic.searches[0]
+    assert request["_source"] == ["id"]
+    assert kwargs["filter_path"] == SEARCH_FILTER_PATH
+    assert orjson.loads(body)["items"] == [{"id": "1"}]
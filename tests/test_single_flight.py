@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aioredis")
+
+from services.cache import SingleFlight  # noqa: E402
+
+
+class Loader:
+    def __init__(self, result="value"):
+        self.result = result
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_concurrent_misses_share_one_load():
+    flight = SingleFlight()
+    loader = Loader()
+
+    async def main():
+        loader.release = asyncio.Event()
+        waiters = [asyncio.ensure_future(flight.do("k", loader)) for _ in range(3)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(main()) == ["value"] * 3
+    assert loader.calls == 1
+    assert flight.stats()["deduplicated"] == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_load():
+    flight = SingleFlight()
+    loader = Loader()
+
+    async def main():
+        loader.release = asyncio.Event()
+        first = asyncio.ensure_future(flight.do("k", loader))
+        second = asyncio.ensure_future(flight.do("k", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        loader.release.set()
+        return await second
+
+    assert asyncio.run(main()) == "value"
+    assert loader.calls == 1
+
+
+def test_failed_load_reaches_all_waiters_and_frees_key():
+    flight = SingleFlight()
+    loader = Loader(RuntimeError("down"))
+
+    async def main():
+        loader.release = asyncio.Event()
+        waiters = [asyncio.ensure_future(flight.do("k", loader)) for _ in range(2)]
+        await asyncio.sleep(0)
+        loader.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        loader.result = "value"
+        return results, await flight.do("k", loader)
+
+    results, retried = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == "value"
+    assert loader.calls == 2
+
+
+def test_refresh_is_skipped_while_key_is_loading():
+    flight = SingleFlight()
+    loader = Loader()
+
+    async def main():
+        loader.release = asyncio.Event()
+        waiter = asyncio.ensure_future(flight.do("k", loader))
+        await asyncio.sleep(0)
+        flight.refresh("k", loader)
+        loader.release.set()
+        return await waiter
+
+    assert asyncio.run(main()) == "value"
+    assert loader.calls == 1
+    assert flight.stats()["refreshes"] == 0
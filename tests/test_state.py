@@ -0,0 +1,26 @@
+import pytest
+
+from bench_etl import MemoryStorage
+from state import JsonFileStorage, SqliteStorage, State
+
+
+@pytest.fixture(params=["memory", "json", "sqlite"])
+def storage(request, tmp_path):
+    if request.param == "json":
+        return JsonFileStorage(str(tmp_path / "state.json"))
+    if request.param == "sqlite":
+        return SqliteStorage(str(tmp_path / "state.sqlite3"))
+    return MemoryStorage()
+
+
+def test_delete_states_removes_keys_from_storage(storage):
+    state = State(storage)
+    state.set_states(
+        {"movies_modified": "2021-01-01", "movies_backfill_0_of_2_id": "a"}
+    )
+
+    state.delete_states(["movies_backfill_0_of_2_id", "missing"])
+
+    assert state.get_state("movies_backfill_0_of_2_id") is None
+    assert storage.retrieve_state() == {"movies_modified": "2021-01-01"}
+    assert State(storage).state == {"movies_modified": "2021-01-01"}
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aioredis")
+
+from core.config import settings  # noqa: E402
+from services.warmup import Warmer  # noqa: E402
+
+
+@pytest.fixture
+def warmer(monkeypatch):
+    monkeypatch.setattr(settings, "WARMUP_DEBOUNCE", 0.1)
+    monkeypatch.setattr(settings, "WARMUP_MAX_DELAY", 0.5)
+    warmer = Warmer(redis=None, film_service=None)
+    warmer.started = []
+
+    async def warm_up():
+        warmer.started.append(asyncio.get_event_loop().time())
+
+    warmer.warm_up = warm_up
+    return warmer
+
+
+async def send_events(warmer, count, interval, index="movies"):
+    loop = asyncio.get_event_loop()
+    for _ in range(count):
+        warmer.schedule(index)
+        await asyncio.sleep(interval)
+    return loop.time()
+
+
+def test_warm_up_waits_for_quiet_period(warmer):
+    async def main():
+        last_event = await send_events(warmer, 5, 0.03)
+        assert warmer.started == []
+        await asyncio.sleep(0.2)
+        return last_event
+
+    last_event = asyncio.run(main())
+
+    assert len(warmer.started) == 1
+    assert warmer.started[0] >= last_event - 0.03 + 0.1
+
+
+def test_continuous_events_do_not_postpone_warm_up_forever(warmer):
+    async def main():
+        loop = asyncio.get_event_loop()
+        first_event = loop.time()
+        await send_events(warmer, 40, 0.03)
+        return first_event
+
+    first_event = asyncio.run(main())
+
+    assert warmer.started
+    assert warmer.started[0] - first_event < 0.5 + 0.1
+
+
+def test_other_indexes_are_ignored(warmer):
+    async def main():
+        await send_events(warmer, 1, 0.2, index="persons")
+
+    asyncio.run(main())
+
+    assert warmer.started == []